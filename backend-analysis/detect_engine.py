@@ -15,18 +15,83 @@ import io
 import json
 import os
 os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp"
+import queue
 import signal
 import sys
 import time
 import threading
-from datetime import datetime
+from collections import Counter
 from typing import Optional, List, Dict, Any
 
 import cv2
 import numpy as np
 import requests
+import torch
+import torch.nn.functional as F
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPDigestAuth
 from ultralytics import YOLO
+from ultralytics.utils import ops
+
+# orjson serializes several times faster than json and emits bytes directly
+try:
+    import orjson
+
+    def json_bytes(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def json_bytes(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+
+
+def utc_timestamp() -> str:
+    """
+    Current UTC time as ISO 8601 with microseconds and a 'Z' suffix.
+
+    Cheaper than datetime.utcnow().isoformat() on the per-detection path.
+    """
+    ns = time.time_ns()
+    secs, micros = divmod(ns // 1000, 1_000_000)
+    return f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(secs))}.{micros:06d}Z"
+
+
+# nvJPEG decode straight into GPU memory for HTTP snapshots
+try:
+    from torchvision.io import decode_jpeg, ImageReadMode
+    TORCHVISION_AVAILABLE = True
+except ImportError:
+    TORCHVISION_AVAILABLE = False
+
+# TensorRT for fp16/int8 engines (without it, those precisions run PyTorch)
+try:
+    import tensorrt  # noqa: F401
+    TENSORRT_AVAILABLE = True
+except ImportError:
+    TENSORRT_AVAILABLE = False
+
+# Numba JIT for small numeric loops (falls back to NumPy)
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def normalize_bboxes(xyxy: np.ndarray, width: int, height: int) -> np.ndarray:
+        """Scale (N, 4) pixel [x1, y1, x2, y2] boxes to 0-1 by frame size."""
+        out = np.empty_like(xyxy)
+        for i in range(xyxy.shape[0]):
+            out[i, 0] = xyxy[i, 0] / width
+            out[i, 1] = xyxy[i, 1] / height
+            out[i, 2] = xyxy[i, 2] / width
+            out[i, 3] = xyxy[i, 3] / height
+        return out
+else:
+    def normalize_bboxes(xyxy: np.ndarray, width: int, height: int) -> np.ndarray:
+        """Scale (N, 4) pixel [x1, y1, x2, y2] boxes to 0-1 by frame size."""
+        return xyxy / np.array([width, height, width, height], dtype=xyxy.dtype)
+
 
 # Redis for decoupled pub/sub
 try:
@@ -36,6 +101,13 @@ except ImportError:
     REDIS_AVAILABLE = False
     print("[DetectEngine] Redis not available, will use HTTP fallback", file=sys.stderr)
 
+# libjpeg-turbo for faster JPEG encode/decode (falls back to cv2.imencode/imdecode)
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420
+    TURBOJPEG_AVAILABLE = True
+except ImportError:
+    TURBOJPEG_AVAILABLE = False
+
 # Import Telegram notifier
 try:
     from notifier import send_alert
@@ -52,25 +124,64 @@ class SecureWatchDetector:
 
     # Classes we care about for security surveillance
     ALLOWED_CLASSES = {'person', 'car', 'truck', 'motorcycle', 'bicycle', 'bus'}
+    # Box colors per class (BGR); other classes get DEFAULT_BOX_COLOR
+    BOX_COLORS = {
+        'person': (0, 255, 0),    # Green
+        'car': (255, 165, 0),     # Orange
+        'truck': (255, 0, 0),     # Blue
+        'motorcycle': (255, 255, 0),  # Cyan
+        'bicycle': (0, 255, 255),  # Yellow
+        'bus': (128, 0, 128),     # Purple
+    }
+    DEFAULT_BOX_COLOR = (0, 255, 0)  # Green default
+    # Classes whose live detections carry an annotated frame_image
+    SNAPSHOT_CLASSES = frozenset(('person', 'car'))
 
     # Default confidence threshold
     DEFAULT_CONFIDENCE = 0.3
 
+    # Model weights and TensorRT export settings
+    MODEL_WEIGHTS = "yolo11m.pt"
+    ENGINE_IMGSZ = 640
+    DEFAULT_PRECISION = 'fp16'  # fp32 (PyTorch), fp16 or int8 (TensorRT)
+
     # Frame skip for file processing (every Nth frame)
     FILE_FRAME_SKIP = 10
+    FILE_BATCH_SIZE = 8  # Frames per YOLO forward when processing files
 
     # Live stream settings
     LIVE_FRAME_SKIP = 3  # Process every 3rd frame for live (higher FPS needed)
+    LIVE_BATCH_SIZE = 2  # Small batches keep live latency bounded
     RECONNECT_DELAY = 5  # Seconds to wait before reconnecting
+    CAPTURE_QUEUE_SIZE = 2  # Frames buffered between capture and inference threads
+    CAPTURE_FAILURE_BURST = 10  # Consecutive failed reads (~0.1s) reported as one None
+    GST_DECODER = 'nvh264dec'  # GStreamer decoder element used with --gstreamer
 
     # HTTP snapshot polling settings
     HTTP_POLL_INTERVAL = 0.5  # Seconds between snapshot fetches (2 FPS)
     HTTP_TIMEOUT = 10  # HTTP request timeout in seconds
+    SNAPSHOT_BUFFER_SIZE = 1 << 20  # Initial snapshot read buffer (grows if needed)
 
     # Telegram alert settings
     ALERT_COOLDOWN = 30  # Seconds between Telegram alerts
     ALERT_CONFIDENCE_THRESHOLD = 0.7  # Minimum confidence for alerts
 
+    # Motion gate (enabled with --motion-threshold): frames with fewer moving
+    # pixels than the threshold at MOTION_SIZE skip YOLO and count as empty
+    MOTION_SIZE = (320, 180)  # (width, height) the background model runs at
+    MOTION_HISTORY = 500
+    MOTION_VAR_THRESHOLD = 25
+
+    # JPEG quality for episode frames and live snapshots
+    JPEG_QUALITY = 85
+    # Seconds an unchanged detection set goes without a new frame_image
+    SNAPSHOT_REPEAT_INTERVAL = 0.5
+
+    # Background detection delivery (Redis pipeline / keep-alive HTTP)
+    POST_QUEUE_SIZE = 256  # Pending detections before new ones are dropped
+    POST_BATCH_MAX = 16  # Detections coalesced into one delivery round
+    POST_BATCH_WAIT = 0.05  # Seconds to wait for more detections to coalesce
+
     # Heartbeat settings for health monitoring
     HEARTBEAT_INTERVAL = 5  # Seconds between heartbeat writes to Redis
 
@@ -84,7 +195,11 @@ class SecureWatchDetector:
         username: Optional[str] = None,
         password: Optional[str] = None,
         redis_host: Optional[str] = None,
-        redis_port: int = 6379
+        redis_port: int = 6379,
+        precision: str = DEFAULT_PRECISION,
+        calib_data: Optional[str] = None,
+        gstreamer: bool = False,
+        motion_threshold: int = 0
     ):
         """
         Initialize the detector.
@@ -99,6 +214,10 @@ class SecureWatchDetector:
             password: HTTP auth password (for HTTP mode)
             redis_host: Redis server hostname (enables pub/sub mode)
             redis_port: Redis server port (default 6379)
+            precision: 'fp32', 'fp16' or 'int8' (fp16/int8 run a cached TensorRT engine)
+            calib_data: Dataset yaml with calibration images (required for int8)
+            gstreamer: Decode LIVE RTSP streams through a GStreamer NVDEC pipeline
+            motion_threshold: Moving pixels (at MOTION_SIZE) needed to run YOLO; 0 disables the gate
         """
         self.mode = mode.upper()
         self.source = source
@@ -109,8 +228,21 @@ class SecureWatchDetector:
         self.password = password
         self.redis_host = redis_host
         self.redis_port = redis_port
+        self.gstreamer = gstreamer
+        self.motion_threshold = motion_threshold
+
+        # Background model for the motion gate
+        self.bg_subtractor = None
+        if motion_threshold > 0:
+            self.bg_subtractor = cv2.createBackgroundSubtractorMOG2(
+                history=self.MOTION_HISTORY,
+                varThreshold=self.MOTION_VAR_THRESHOLD,
+                detectShadows=False
+            )
 
         self.running = True
+        # Set alongside running=False so sleeping threads wake up immediately
+        self.stop_event = threading.Event()
         self.cap: Optional[cv2.VideoCapture] = None
         self.frame_count = 0
         self.detection_count = 0
@@ -118,11 +250,54 @@ class SecureWatchDetector:
         # Telegram alert cooldown
         self.last_alert_time = 0
 
+        # Reused scratch frame for drawing boxes on detection snapshots
+        self.annotate_buf: Optional[np.ndarray] = None
+        # (frame, detections, annotated JPEG) of the last detection snapshot
+        self.last_snapshot: Optional[tuple] = None
+        # Coarse signature of the detections in the last snapshot, and when
+        self.last_snapshot_sig: Optional[tuple] = None
+        self.last_snapshot_time = 0.0
+        # Pre-rendered box labels keyed by (label, color)
+        self.label_tiles: Dict[tuple, np.ndarray] = {}
+
+        # Alert thread doing the JPEG write + Telegram upload (one pending alert max)
+        self.alert_queue: queue.Queue = queue.Queue(maxsize=1)
+        self.alert_thread: Optional[threading.Thread] = None
+
         # HTTP session for snapshot polling (with Digest auth)
         self.http_session: Optional[requests.Session] = None
+        self.snapshot_buf: Optional[bytearray] = None
 
-        # Heartbeat thread for health monitoring
-        self.heartbeat_thread: Optional[threading.Thread] = None
+        # SIMD JPEG codec for frame encodes and HTTP snapshots (None -> OpenCV)
+        self.turbojpeg = None
+        if TURBOJPEG_AVAILABLE:
+            try:
+                self.turbojpeg = TurboJPEG()
+            except Exception as e:
+                print(f"[DetectEngine] libturbojpeg not loadable, using OpenCV JPEG: {e}",
+                      file=sys.stderr)
+        # Worst-case-sized JPEG output buffer, reused across encodes
+        self.jpeg_scratch: Optional[np.ndarray] = None
+
+        # Sender thread draining detections to Redis/HTTP off the hot loop
+        self.post_queue: queue.Queue = queue.Queue(maxsize=self.POST_QUEUE_SIZE)
+        self.post_thread: Optional[threading.Thread] = None
+
+        # Keep-alive session for HTTP fallback POSTs (detections from the
+        # sender thread, episodes from the detection thread)
+        self.post_session: Optional[requests.Session] = None
+        if self.endpoint:
+            self.post_session = requests.Session()
+            self.post_session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+            self.post_session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+            self.post_session.headers['Content-Type'] = 'application/json'
+
+        # Capture thread for live streams (reads while inference runs)
+        self.capture_thread: Optional[threading.Thread] = None
+        self.capture_stop = threading.Event()
+        # Hands the capture over to a thread still stuck in grab() at stop time
+        self.capture_lock = threading.Lock()
+        self.capture_state: Dict[str, bool] = {}
 
         # Redis client for pub/sub (preferred over HTTP)
         self.redis_client: Optional[redis.Redis] = None
@@ -149,11 +324,127 @@ class SecureWatchDetector:
         # Load YOLO model
         print(f"[DetectEngine] Loading YOLO model...", file=sys.stderr)
         # YOLO11m - Faster, more accurate, fewer false positives than YOLOv8m
-        self.model = YOLO("yolo11m.pt")
+        self.model = self._load_model(precision, calib_data)
         print(f"[DetectEngine] YOLO11m model loaded successfully", file=sys.stderr)
 
         # Get class name mapping from model
         self.class_names = self.model.names
+        # Plain dict is cheaper to index than the model's names mapping
+        self.class_id_to_name = dict(self.class_names)
+        # Lowercased once here so per-detection checks never call .lower()
+        self.class_id_to_lower = {
+            cls_id: name.lower() for cls_id, name in self.class_id_to_name.items()
+        }
+
+        # Resolve ALLOWED_CLASSES to ids once; per-box filtering is then an
+        # integer lookup instead of a name lookup + string set test
+        self.allowed_class_ids = frozenset(
+            cls_id for cls_id, name in self.class_id_to_name.items() if name in self.ALLOWED_CLASSES
+        )
+        self.allowed_class_mask = np.zeros(max(self.class_id_to_name) + 1, dtype=bool)
+        self.allowed_class_mask[list(self.allowed_class_ids)] = True
+
+        # Box color per class id, so drawing indexes a list instead of
+        # hashing class names per box
+        self.class_colors = [self.DEFAULT_BOX_COLOR] * (max(self.class_id_to_name) + 1)
+        for cls_id, name in self.class_id_to_lower.items():
+            self.class_colors[cls_id] = self.BOX_COLORS.get(name, self.DEFAULT_BOX_COLOR)
+
+        # Letterbox on the GPU instead of in Ultralytics' CPU preprocess
+        self.gpu_preprocess = torch.cuda.is_available()
+        if self.gpu_preprocess:
+            # Input batch and pinned staging buffers are allocated once and reused
+            max_batch = max(self.FILE_BATCH_SIZE, self.LIVE_BATCH_SIZE)
+            self.gpu_input = torch.empty(
+                (max_batch, 3, self.ENGINE_IMGSZ, self.ENGINE_IMGSZ), device='cuda'
+            )
+            self.pinned_frames: Dict[int, torch.Tensor] = {}
+
+        # HTTP snapshots decode on the GPU (nvJPEG) and only come back to the
+        # CPU when a frame has detections to draw/encode
+        self.gpu_decode = self.mode == 'HTTP' and self.gpu_preprocess and TORCHVISION_AVAILABLE
+
+    def _load_model(self, precision: str, calib_data: Optional[str] = None) -> YOLO:
+        """
+        Load YOLO11m, exporting it once to a TensorRT engine for fp16/int8.
+
+        The engine is cached next to the weights and rebuilt when the .pt (or,
+        for int8, the calibration yaml, which is also part of the engine name)
+        is newer. Engines are specific to the GPU and TensorRT version that
+        built them. Falls back to the PyTorch weights when no GPU/TensorRT is
+        available; a failed export leaves a .failed marker so later starts skip
+        retrying it until the weights change.
+
+        Args:
+            precision: 'fp32', 'fp16' or 'int8'
+            calib_data: Dataset yaml with calibration images (required for int8)
+
+        Returns:
+            Loaded YOLO model
+        """
+        if precision == 'fp32' or not torch.cuda.is_available():
+            return YOLO(self.MODEL_WEIGHTS)
+
+        stem = os.path.splitext(self.MODEL_WEIGHTS)[0]
+        # The build inputs: the weights, plus the calibration set for int8
+        sources = [self.MODEL_WEIGHTS]
+        if precision == 'int8':
+            if not calib_data:
+                raise ValueError("int8 precision requires calib_data")
+            # Engines calibrated on different sets must not share a cache file
+            calib_name = ''.join(
+                c if c.isalnum() else '_'
+                for c in os.path.splitext(os.path.basename(calib_data))[0])
+            engine_path = f"{stem}-int8-{calib_name}.engine"
+            sources.append(calib_data)
+        else:
+            engine_path = f"{stem}-{precision}.engine"
+        failed_path = f"{engine_path}.failed"
+
+        def newer_than_sources(path: str) -> bool:
+            return os.path.exists(path) and all(
+                not os.path.exists(src) or os.path.getmtime(path) >= os.path.getmtime(src)
+                for src in sources)
+
+        fresh = newer_than_sources(engine_path)
+        if not fresh and not TENSORRT_AVAILABLE:
+            print(f"[DetectEngine] TensorRT not installed, using PyTorch weights",
+                  file=sys.stderr)
+            return YOLO(self.MODEL_WEIGHTS)
+        if not fresh and newer_than_sources(failed_path):
+            print(f"[DetectEngine] TensorRT export failed previously ({failed_path}), "
+                  f"using PyTorch weights", file=sys.stderr)
+            return YOLO(self.MODEL_WEIGHTS)
+        if not fresh:
+            print(f"[DetectEngine] Exporting {self.MODEL_WEIGHTS} to TensorRT {precision} "
+                  f"(one-time, may take a few minutes)", file=sys.stderr)
+            try:
+                export_args = {
+                    'format': 'engine',
+                    'imgsz': self.ENGINE_IMGSZ,
+                    'device': 0,
+                    # Dynamic batch up to the largest batch the loops send
+                    'dynamic': True,
+                    'batch': max(self.FILE_BATCH_SIZE, self.LIVE_BATCH_SIZE),
+                }
+                if precision == 'int8':
+                    export_args.update(int8=True, data=calib_data)
+                else:
+                    export_args['half'] = True
+                exported = YOLO(self.MODEL_WEIGHTS).export(**export_args)
+                os.replace(exported, engine_path)
+            except Exception as e:
+                print(f"[DetectEngine] TensorRT export failed, using PyTorch weights: {e}",
+                      file=sys.stderr)
+                try:
+                    with open(failed_path, 'w') as f:
+                        f.write(f"{e}\n")
+                except OSError:
+                    pass
+                return YOLO(self.MODEL_WEIGHTS)
+
+        print(f"[DetectEngine] Using TensorRT engine: {engine_path}", file=sys.stderr)
+        return YOLO(engine_path, task='detect')
 
     def start(self):
         """
@@ -164,8 +455,14 @@ class SecureWatchDetector:
         print(f"[DetectEngine] Camera ID: {self.cam_id}", file=sys.stderr)
         print(f"[DetectEngine] Endpoint: {self.endpoint}", file=sys.stderr)
 
-        # Start heartbeat thread for health monitoring
-        self._start_heartbeat_thread()
+        # Start sender thread for detection delivery (also writes the heartbeat)
+        if not self.redis_client:
+            print(f"[DetectEngine] Heartbeat disabled - no Redis connection", file=sys.stderr)
+        self._start_post_thread()
+
+        # Start Telegram alert thread
+        if TELEGRAM_ENABLED:
+            self._start_alert_thread()
 
         try:
             if self.mode == 'UPLOAD':
@@ -191,7 +488,7 @@ class SecureWatchDetector:
 
         # Accumulate frames for episode
         episode_frames: List[Dict[str, Any]] = []
-        detections_summary: Dict[str, int] = {}
+        detections_summary: Counter = Counter()
         start_time = time.time()
 
         try:
@@ -204,55 +501,37 @@ class SecureWatchDetector:
 
             print(f"[DetectEngine] Video FPS: {fps}, Total frames: {total_frames}", file=sys.stderr)
 
-            while self.running:
-                ret, frame = self.cap.read()
-                if not ret:
-                    break
-
-                self.frame_count += 1
-
-                # Skip frames for efficiency
-                if self.frame_count % self.FILE_FRAME_SKIP != 0:
-                    continue
-
-                # Run YOLO detection
-                detections = self._detect_frame(frame)
-
+            # Run YOLO detection in batches of kept frames
+            for frame, frame_number, detections in self._detect_batched(
+                self._read_file_frames(), self.FILE_BATCH_SIZE
+            ):
                 # Calculate timestamp relative to video start
-                frame_timestamp = self.frame_count / fps
+                frame_timestamp = frame_number / fps
 
                 if detections:
                     # Create per-frame episode data for real-time output
-                    episode_data = self._create_episode_data(detections, frame)
+                    episode_data = self._create_episode_data(detections, frame, frame_number)
 
                     # Output to stdout for Node.js to capture (real-time)
-                    print(f"DETECTION_JSON:{json.dumps(episode_data)}")
-                    sys.stdout.flush()
+                    self._emit_detection_json(episode_data)
 
                     # Also POST individual detection if configured
                     self._post_detection(episode_data)
 
                     # Send Telegram alert for high-confidence person detections
-                    self._send_telegram_alert(frame, detections)
+                    # (cooldown checked here so most frames skip the call entirely)
+                    if TELEGRAM_ENABLED and time.time() - self.last_alert_time >= self.ALERT_COOLDOWN:
+                        self._send_telegram_alert(frame, detections)
 
                     # Accumulate frame for episode batch
-                    frame_detections = []
-                    for det in detections:
-                        frame_detections.append({
-                            'label': det['class'],
-                            'confidence': det['confidence'],
-                            'bbox': det['bbox']
-                        })
-                        # Update detection summary counts
-                        cls_name = det['class']
-                        detections_summary[cls_name] = detections_summary.get(cls_name, 0) + 1
+                    self._accumulate_summary(detections, detections_summary)
 
                     episode_frames.append({
                         'seq': len(episode_frames),
-                        'image': frame.copy(),  # Copy frame for later serialization
-                        'detections': frame_detections,
+                        'image_jpeg': self._encode_frame(frame),  # Compressed for the episode buffer
+                        'detections': self._pack_detections(detections),
                         'timestamp': frame_timestamp,
-                        'frame_number': self.frame_count
+                        'frame_number': frame_number
                     })
 
             # End of file - compute final summary and send episode
@@ -278,6 +557,23 @@ class SecureWatchDetector:
                 self.cap.release()
                 self.cap = None
 
+    def _read_file_frames(self):
+        """
+        Yield (frame, frame_number) for every FILE_FRAME_SKIP-th frame of the video.
+        """
+        while self.running:
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+
+            self.frame_count += 1
+
+            # Skip frames for efficiency
+            if self.frame_count % self.FILE_FRAME_SKIP != 0:
+                continue
+
+            yield frame, self.frame_count
+
     def _run_stream_loop(self):
         """
         Process a live RTSP stream continuously.
@@ -295,7 +591,7 @@ class SecureWatchDetector:
                 if self.running:
                     print(f"[DetectEngine] Reconnecting in {self.RECONNECT_DELAY}s...",
                           file=sys.stderr)
-                    time.sleep(self.RECONNECT_DELAY)
+                    self.stop_event.wait(self.RECONNECT_DELAY)
 
     def _connect_stream(self):
         """
@@ -304,8 +600,22 @@ class SecureWatchDetector:
         print(f"[DetectEngine] Connecting to stream: {self.source}", file=sys.stderr)
 
         # Release existing capture if any
-        if self.cap is not None:
+        if self._stop_capture_thread() and self.cap is not None:
             self.cap.release()
+        self.cap = None
+
+        if self.gstreamer:
+            # Hardware (NVDEC) decode through GStreamer; appsink keeps only the newest frame
+            pipeline = (
+                f"rtspsrc location={self.source} protocols=tcp latency=0 ! "
+                f"rtph264depay ! h264parse ! {self.GST_DECODER} ! videoconvert ! "
+                f"video/x-raw,format=BGR ! appsink drop=true max-buffers=1 sync=false"
+            )
+            self.cap = cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
+            if not self.cap.isOpened():
+                raise RuntimeError(f"Failed to open GStreamer pipeline for: {self.source}")
+            print(f"[DetectEngine] Connected via GStreamer ({self.GST_DECODER})", file=sys.stderr)
+            return
 
         # Create capture with RTSP-optimized settings
         self.cap = cv2.VideoCapture(self.source, cv2.CAP_FFMPEG)
@@ -331,7 +641,7 @@ class SecureWatchDetector:
         """
         # Episode buffering state
         active_frames: List[Dict[str, Any]] = []
-        detections_summary: Dict[str, int] = {}
+        detections_summary: Counter = Counter()
         silence_counter = 0
         episode_start_time: Optional[float] = None
         episode_count = 0
@@ -340,34 +650,14 @@ class SecureWatchDetector:
         SILENCE_THRESHOLD = 15  # ~0.5 seconds at 30fps with LIVE_FRAME_SKIP=3
         MAX_EPISODE_FRAMES = 300  # Cap episode size to prevent memory issues
 
-        # Connection health tracking
-        consecutive_failures = 0
-        max_failures = 30  # ~1 second of failures at 30fps
-
         print(f"[DetectEngine] Processing stream with silence threshold: {SILENCE_THRESHOLD}",
               file=sys.stderr)
 
         try:
-            while self.running and consecutive_failures < max_failures:
-                ret, frame = self.cap.read()
-
-                if not ret:
-                    consecutive_failures += 1
-                    time.sleep(0.01)  # Brief sleep on read failure
-                    continue
-
-                consecutive_failures = 0
-                self.frame_count += 1
-
-                # Skip frames for live processing efficiency
-                if self.frame_count % self.LIVE_FRAME_SKIP != 0:
-                    continue
-
-                # Get current timestamp
-                current_time = time.time()
-
-                # Run YOLO detection
-                detections = self._detect_frame(frame)
+            # Run YOLO detection in small batches of kept frames
+            for frame, (frame_number, current_time), detections in self._detect_batched(
+                self._read_stream_frames(), self.LIVE_BATCH_SIZE
+            ):
                 has_detections = len(detections) > 0
 
                 if has_detections:
@@ -377,40 +667,32 @@ class SecureWatchDetector:
                     # Start new episode if not already active
                     if episode_start_time is None:
                         episode_start_time = current_time
-                        print(f"[DetectEngine] Episode started at frame {self.frame_count}",
+                        print(f"[DetectEngine] Episode started at frame {frame_number}",
                               file=sys.stderr)
 
                     # Create per-frame data for real-time output
-                    episode_data = self._create_episode_data(detections, frame)
+                    episode_data = self._create_episode_data(detections, frame, frame_number)
 
                     # Output to stdout for real-time processing
-                    print(f"DETECTION_JSON:{json.dumps(episode_data)}")
-                    sys.stdout.flush()
+                    self._emit_detection_json(episode_data)
 
                     # POST individual detection
                     self._post_detection(episode_data)
 
                     # Send Telegram alert for high-confidence person detections
-                    self._send_telegram_alert(frame, detections)
+                    # (cooldown checked here so most frames skip the call entirely)
+                    if TELEGRAM_ENABLED and time.time() - self.last_alert_time >= self.ALERT_COOLDOWN:
+                        self._send_telegram_alert(frame, detections)
 
                     # Accumulate frame for episode batch
-                    frame_detections = []
-                    for det in detections:
-                        frame_detections.append({
-                            'label': det['class'],
-                            'confidence': det['confidence'],
-                            'bbox': det['bbox']
-                        })
-                        # Update detection summary counts
-                        cls_name = det['class']
-                        detections_summary[cls_name] = detections_summary.get(cls_name, 0) + 1
+                    self._accumulate_summary(detections, detections_summary)
 
                     active_frames.append({
                         'seq': len(active_frames),
-                        'image': frame.copy(),
-                        'detections': frame_detections,
+                        'image_jpeg': self._encode_frame(frame),
+                        'detections': self._pack_detections(detections),
                         'timestamp': current_time,
-                        'frame_number': self.frame_count
+                        'frame_number': frame_number
                     })
 
                     # Check if episode is too large - send and reset
@@ -421,7 +703,7 @@ class SecureWatchDetector:
                         episode_count += 1
                         # Reset for next episode segment
                         active_frames = []
-                        detections_summary = {}
+                        detections_summary = Counter()
                         episode_start_time = current_time  # Continue as new episode
 
                 else:
@@ -444,22 +726,13 @@ class SecureWatchDetector:
 
                         # Reset episode state
                         active_frames = []
-                        detections_summary = {}
+                        detections_summary = Counter()
                         episode_start_time = None
                         silence_counter = 0
 
-            # Handle stream disconnect
-            if consecutive_failures >= max_failures:
-                # Send any pending episode before raising error
-                if active_frames:
-                    print(f"[DetectEngine] Sending pending episode before reconnect",
-                          file=sys.stderr)
-                    self._send_episode(active_frames, detections_summary)
-                    episode_count += 1
-                raise RuntimeError("Too many consecutive frame read failures")
-
         finally:
             # Send any remaining frames as final episode on cleanup
+            # (also covers the disconnect raised by _read_stream_frames)
             if active_frames:
                 print(f"[DetectEngine] Sending final episode on stream end",
                       file=sys.stderr)
@@ -470,6 +743,134 @@ class SecureWatchDetector:
                   f"Total episodes: {episode_count}, Total frames: {self.frame_count}",
                   file=sys.stderr)
 
+    def _read_stream_frames(self):
+        """
+        Yield (frame, (frame_number, timestamp)) for every LIVE_FRAME_SKIP-th frame.
+
+        Frames come from a capture thread through a small drop-oldest queue,
+        so the RTSP socket keeps draining while inference runs.
+
+        Yields None on a read failure so a partially filled batch is flushed
+        instead of waiting on a stalled stream. Raises RuntimeError after too
+        many consecutive failures to trigger a reconnect.
+        """
+        # Connection health tracking; each None stands for CAPTURE_FAILURE_BURST
+        # failed reads
+        consecutive_failures = 0
+        max_failures = 10  # ~1 second of failed reads
+
+        frame_queue = self._start_capture_thread()
+
+        while self.running:
+            try:
+                item = frame_queue.get(timeout=1.0)
+            except queue.Empty:
+                item = None
+
+            if item is None:
+                consecutive_failures += 1
+                if consecutive_failures >= max_failures:
+                    raise RuntimeError("Too many consecutive frame read failures")
+                yield None
+                continue
+
+            consecutive_failures = 0
+            frame_number, frame = item
+
+            yield frame, (frame_number, time.time())
+
+    def _start_capture_thread(self) -> queue.Queue:
+        """
+        Start a producer thread reading self.cap into a bounded queue.
+
+        Only every LIVE_FRAME_SKIP-th frame is retrieved and queued as
+        (frame_number, frame). When the queue is full the oldest frame is
+        dropped, so the consumer always gets recent frames. Every
+        CAPTURE_FAILURE_BURST consecutive failed reads queue one None, and only
+        into free space, so read failures never evict a real frame.
+
+        Returns:
+            The frame queue
+        """
+        self._stop_capture_thread()
+
+        frame_queue: queue.Queue = queue.Queue(maxsize=self.CAPTURE_QUEUE_SIZE)
+        cap = self.cap
+        state = {'done': False, 'orphaned': False}
+        self.capture_state = state
+        self.capture_stop.clear()
+
+        def capture_loop():
+            try:
+                self._capture_frames(cap, frame_queue)
+            finally:
+                with self.capture_lock:
+                    state['done'] = True
+                    if state['orphaned']:
+                        # _stop_capture_thread gave up waiting; the capture is ours
+                        cap.release()
+
+        self.capture_thread = threading.Thread(target=capture_loop, daemon=True)
+        self.capture_thread.start()
+        return frame_queue
+
+    def _capture_frames(self, cap, frame_queue: queue.Queue):
+        """
+        Body of the capture thread: read frames until stopped.
+        """
+        failures = 0
+        while self.running and not self.capture_stop.is_set():
+            # grab() advances the stream; only frames we keep pay for
+            # retrieve() (YUV->BGR conversion + copy)
+            ret = cap.grab()
+            if ret:
+                self.frame_count += 1
+
+                # Skip frames for live processing efficiency
+                if self.frame_count % self.LIVE_FRAME_SKIP != 0:
+                    failures = 0
+                    continue
+
+                ret, frame = cap.retrieve()
+
+            if not ret:
+                failures += 1
+                if failures % self.CAPTURE_FAILURE_BURST == 0 and not frame_queue.full():
+                    frame_queue.put_nowait(None)
+                time.sleep(0.01)  # Brief sleep on read failure
+                continue
+            failures = 0
+
+            # Drop the oldest frame rather than block the reader
+            if frame_queue.full():
+                try:
+                    frame_queue.get_nowait()
+                except queue.Empty:
+                    pass
+            frame_queue.put_nowait((self.frame_count, frame))
+
+    def _stop_capture_thread(self) -> bool:
+        """
+        Stop the capture thread (if any) before its capture is released.
+
+        Returns:
+            True if the caller may release self.cap. False if the thread is
+            still blocked in grab()/retrieve() (e.g. a stalled RTSP socket);
+            it then owns the capture and releases it when the call returns.
+        """
+        if self.capture_thread is None:
+            return True
+        self.capture_stop.set()
+        self.capture_thread.join(timeout=2)
+        self.capture_thread = None
+        with self.capture_lock:
+            if self.capture_state['done']:
+                return True
+            self.capture_state['orphaned'] = True
+        print(f"[DetectEngine] Capture thread still blocked, leaving the release to it",
+              file=sys.stderr)
+        return False
+
     def _run_http_loop(self):
         """
         Process snapshots from an HTTP endpoint (Hikvision ISAPI or similar).
@@ -500,7 +901,7 @@ class SecureWatchDetector:
                     self.http_session.close()
                     self.http_session = None
 
-                time.sleep(self.RECONNECT_DELAY)
+                self.stop_event.wait(self.RECONNECT_DELAY)
 
         print(f"[DetectEngine] HTTP loop ended after {reconnect_count} reconnects", file=sys.stderr)
 
@@ -508,15 +909,29 @@ class SecureWatchDetector:
         """
         Internal HTTP polling session. Separated for reconnection handling.
         """
-        # Create session with Digest auth
+        # Create session with Digest auth, pinned to one keep-alive connection
         self.http_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        self.http_session.mount('http://', adapter)
+        self.http_session.mount('https://', adapter)
         if self.username and self.password:
             self.http_session.auth = HTTPDigestAuth(self.username, self.password)
             print(f"[DetectEngine] Using Digest auth for user: {self.username}", file=sys.stderr)
 
+            # Do the 401 challenge round trip now so the auth object has a
+            # nonce cached and every snapshot request authenticates up front
+            try:
+                self.http_session.head(self.source, timeout=self.HTTP_TIMEOUT).close()
+            except requests.RequestException as e:
+                print(f"[DetectEngine] Digest warm-up failed: {e}", file=sys.stderr)
+
+        # Reusable buffer snapshots are read into (kept across reconnects)
+        if self.snapshot_buf is None:
+            self.snapshot_buf = bytearray(self.SNAPSHOT_BUFFER_SIZE)
+
         # Episode buffering state (same as stream mode)
         active_frames: List[Dict[str, Any]] = []
-        detections_summary: Dict[str, int] = {}
+        detections_summary: Counter = Counter()
         silence_counter = 0
         episode_start_time: Optional[float] = None
         episode_count = 0
@@ -539,21 +954,24 @@ class SecureWatchDetector:
                         consecutive_failures += 1
                         print(f"[DetectEngine] Snapshot fetch failed ({consecutive_failures}/{MAX_FAILURES})",
                               file=sys.stderr)
-                        time.sleep(self.HTTP_POLL_INTERVAL)
+                        self.stop_event.wait(self.HTTP_POLL_INTERVAL)
                         continue
 
                     consecutive_failures = 0
                     self.frame_count += 1
                     current_time = time.time()
 
-                    # Run YOLO detection
-                    detections = self._detect_frame(frame)
+                    # Run YOLO detection (static scenes are skipped by the motion gate)
+                    detections = self._detect_frame(frame) if self._has_motion(frame) else []
                     has_detections = len(detections) > 0
 
                     if has_detections:
                         # Reset silence counter on activity
                         silence_counter = 0
 
+                        # GPU-decoded snapshots are downloaded only when needed
+                        frame = self._download_frame(frame)
+
                         # Start new episode if not already active
                         if episode_start_time is None:
                             episode_start_time = current_time
@@ -564,31 +982,23 @@ class SecureWatchDetector:
                         episode_data = self._create_episode_data(detections, frame)
 
                         # Output to stdout for real-time processing
-                        print(f"DETECTION_JSON:{json.dumps(episode_data)}")
-                        sys.stdout.flush()
+                        self._emit_detection_json(episode_data)
 
                         # POST individual detection
                         self._post_detection(episode_data)
 
                         # Send Telegram alert for high-confidence person detections
-                        self._send_telegram_alert(frame, detections)
+                        # (cooldown checked here so most frames skip the call entirely)
+                        if TELEGRAM_ENABLED and time.time() - self.last_alert_time >= self.ALERT_COOLDOWN:
+                            self._send_telegram_alert(frame, detections)
 
                         # Accumulate frame for episode batch
-                        frame_detections = []
-                        for det in detections:
-                            frame_detections.append({
-                                'label': det['class'],
-                                'confidence': det['confidence'],
-                                'bbox': det['bbox']
-                            })
-                            # Update detection summary counts
-                            cls_name = det['class']
-                            detections_summary[cls_name] = detections_summary.get(cls_name, 0) + 1
+                        self._accumulate_summary(detections, detections_summary)
 
                         active_frames.append({
                             'seq': len(active_frames),
-                            'image': frame.copy(),
-                            'detections': frame_detections,
+                            'image_jpeg': self._encode_frame(frame),
+                            'detections': self._pack_detections(detections),
                             'timestamp': current_time,
                             'frame_number': self.frame_count
                         })
@@ -600,7 +1010,7 @@ class SecureWatchDetector:
                             self._send_episode(active_frames, detections_summary)
                             episode_count += 1
                             active_frames = []
-                            detections_summary = {}
+                            detections_summary = Counter()
                             episode_start_time = current_time
 
                     else:
@@ -613,7 +1023,7 @@ class SecureWatchDetector:
 
                             print(f"[DetectEngine] Episode ended: {len(active_frames)} frames, "
                                   f"{episode_duration:.2f}s duration, "
-                                  f"detections: {detections_summary}",
+                                  f"detections: {dict(detections_summary)}",
                                   file=sys.stderr)
 
                             self._send_episode(active_frames, detections_summary)
@@ -621,7 +1031,7 @@ class SecureWatchDetector:
 
                             # Reset episode state
                             active_frames = []
-                            detections_summary = {}
+                            detections_summary = Counter()
                             episode_start_time = None
                             silence_counter = 0
 
@@ -633,7 +1043,7 @@ class SecureWatchDetector:
                 elapsed = time.time() - loop_start
                 sleep_time = max(0, self.HTTP_POLL_INTERVAL - elapsed)
                 if sleep_time > 0:
-                    time.sleep(sleep_time)
+                    self.stop_event.wait(sleep_time)
 
             # Handle too many failures - raise to trigger reconnect
             if consecutive_failures >= MAX_FAILURES:
@@ -655,16 +1065,18 @@ class SecureWatchDetector:
                   f"Total episodes: {episode_count}, Total frames: {self.frame_count}",
                   file=sys.stderr)
 
-    def _fetch_http_snapshot(self) -> Optional[np.ndarray]:
+    def _fetch_http_snapshot(self):
         """
         Fetch a snapshot from the HTTP endpoint.
 
         Returns:
-            OpenCV frame (numpy array) or None on failure
+            OpenCV frame (numpy array), CHW RGB uint8 CUDA tensor when
+            gpu_decode is enabled, or None on failure
         """
         if not self.http_session:
             return None
 
+        response = None
         try:
             response = self.http_session.get(
                 self.source,
@@ -677,12 +1089,15 @@ class SecureWatchDetector:
                       file=sys.stderr)
                 return None
 
-            # Read image data
-            image_data = response.content
+            # Read image data into the reusable buffer (no per-request bytes)
+            response.raw.decode_content = True
+            n = self._read_into_snapshot_buf(response.raw)
 
             # Decode JPEG to OpenCV frame
-            nparr = np.frombuffer(image_data, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            with memoryview(self.snapshot_buf) as view:
+                frame = self._decode_jpeg_gpu(view[:n]) if self.gpu_decode else None
+                if frame is None:
+                    frame = self._decode_jpeg(view[:n])
 
             if frame is None:
                 print(f"[DetectEngine] Failed to decode image from HTTP response",
@@ -700,6 +1115,77 @@ class SecureWatchDetector:
         except Exception as e:
             print(f"[DetectEngine] Error fetching HTTP snapshot: {e}", file=sys.stderr)
             return None
+        finally:
+            # stream=True responses hold the connection until closed; closing
+            # after a full read returns it to the keep-alive pool
+            if response is not None:
+                response.close()
+
+    def _read_into_snapshot_buf(self, raw) -> int:
+        """
+        Read a response body into self.snapshot_buf, doubling it if too small.
+
+        Args:
+            raw: urllib3 response (response.raw) to read from
+
+        Returns:
+            Number of bytes read
+        """
+        n = 0
+        while True:
+            if n == len(self.snapshot_buf):
+                self.snapshot_buf.extend(bytes(len(self.snapshot_buf)))
+            with memoryview(self.snapshot_buf) as view:
+                read = raw.readinto(view[n:])
+            if not read:
+                return n
+            n += read
+
+    def _decode_jpeg_gpu(self, image_data) -> Optional[torch.Tensor]:
+        """
+        Decode JPEG bytes on the GPU with nvJPEG.
+
+        Returns:
+            CHW RGB uint8 CUDA tensor, or None if nvJPEG can't decode it
+        """
+        try:
+            data = torch.frombuffer(image_data, dtype=torch.uint8)
+            return decode_jpeg(data, mode=ImageReadMode.RGB, device='cuda')
+        except Exception as e:
+            print(f"[DetectEngine] GPU JPEG decode failed, using CPU decode: {e}",
+                  file=sys.stderr)
+            self.gpu_decode = False
+            return None
+
+    def _download_frame(self, frame) -> np.ndarray:
+        """
+        Bring a GPU-decoded snapshot back as an OpenCV frame.
+
+        Args:
+            frame: CHW RGB uint8 CUDA tensor (numpy frames are returned as-is)
+
+        Returns:
+            OpenCV frame (HWC, BGR, uint8)
+        """
+        if not isinstance(frame, torch.Tensor):
+            return frame
+        return frame.flip(0).permute(1, 2, 0).contiguous().cpu().numpy()
+
+    def _decode_jpeg(self, image_data) -> Optional[np.ndarray]:
+        """
+        Decode JPEG bytes to a BGR frame, using libjpeg-turbo when available.
+
+        Returns:
+            OpenCV frame (numpy array) or None if the data is not a valid JPEG
+        """
+        if self.turbojpeg is not None:
+            try:
+                return self.turbojpeg.decode(image_data, pixel_format=TJPF_BGR)
+            except Exception:
+                # Not a JPEG libjpeg-turbo accepts; let OpenCV try
+                pass
+        nparr = np.frombuffer(image_data, np.uint8)
+        return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
 
     def _detect_frame(self, frame) -> list:
         """
@@ -708,48 +1194,207 @@ class SecureWatchDetector:
         Returns:
             List of detection dictionaries
         """
-        results = self.model(frame, verbose=False, conf=self.confidence)
+        return self._detect_batch([frame])[0]
+
+    def _detect_batch(self, frames: List[np.ndarray]) -> List[list]:
+        """
+        Run YOLO detection on a batch of frames in a single forward pass.
 
-        detections = []
-        for result in results:
+        Frames are OpenCV arrays, or CHW RGB uint8 CUDA tensors when GPU
+        preprocessing is enabled (see _decode_jpeg_gpu).
+
+        Returns:
+            One list of detection dictionaries per input frame, in order
+        """
+        with torch.inference_mode():
+            if self.gpu_preprocess:
+                inputs = self._preprocess_gpu(frames)
+            else:
+                inputs = frames
+            results = self.model(inputs, verbose=False, conf=self.confidence)
+
+        batch_detections = []
+        for frame, result in zip(frames, results):
+            detections = []
             boxes = result.boxes
             if boxes is None:
+                batch_detections.append(detections)
                 continue
 
-            for i, box in enumerate(boxes):
-                cls_id = int(box.cls[0])
-                cls_name = self.class_names.get(cls_id, f"class_{cls_id}")
+            if isinstance(frame, torch.Tensor):
+                height, width = frame.shape[1:]
+            else:
+                height, width = frame.shape[:2]
+
+            xyxy = boxes.xyxy
+            if self.gpu_preprocess:
+                # Map from the letterboxed input back to source frame pixels
+                xyxy = ops.scale_boxes(inputs.shape[2:], xyxy.clone(), (height, width))
+
+            # Pull each field off the device once instead of per box
+            cls_ids = boxes.cls.cpu().numpy().astype(np.int32)
+            confs = boxes.conf.cpu().numpy().astype(np.float64)
+            xyxy = xyxy.cpu().numpy().astype(np.float64)
+
+            # Filter to allowed classes
+            mask = self.allowed_class_mask[cls_ids]
+            cls_ids = cls_ids[mask]
+            confs = confs[mask]
+            xyxy = xyxy[mask]  # [x1, y1, x2, y2]
+
+            # Round in place; the masked arrays are already private copies
+            np.round(confs, 3, out=confs)
+            np.round(xyxy, 1, out=xyxy)
+
+            # Normalized copy for episode payloads, computed once per frame
+            xyxy_norm = normalize_bboxes(xyxy, width, height)
+            np.round(xyxy_norm, 4, out=xyxy_norm)
+
+            for cls_id, conf, bbox, bbox_norm in zip(
+                cls_ids.tolist(), confs.tolist(), xyxy.tolist(), xyxy_norm.tolist()
+            ):
+                detections.append({
+                    'class': self.class_id_to_name[cls_id],
+                    'class_lower': self.class_id_to_lower[cls_id],
+                    'confidence': conf,
+                    'bbox': bbox,
+                    'bbox_normalized': bbox_norm,
+                    'class_id': cls_id
+                })
+
+            self.detection_count += len(cls_ids)
+            batch_detections.append(detections)
+
+        return batch_detections
 
-                # Filter to allowed classes
-                if cls_name not in self.ALLOWED_CLASSES:
+    def _preprocess_gpu(self, frames: List[np.ndarray]) -> torch.Tensor:
+        """
+        Letterbox BGR frames to ENGINE_IMGSZ on the GPU.
+
+        Each frame is copied into a reused pinned buffer and DMA'd to the GPU
+        asynchronously, then converted/resized into the preallocated input
+        batch, so the CPU never touches the full-resolution pixels again.
+
+        Args:
+            frames: OpenCV frames (HWC, BGR, uint8) or CHW RGB uint8 CUDA tensors
+
+        Returns:
+            NCHW RGB float tensor in [0, 1] on the GPU
+        """
+        size = self.ENGINE_IMGSZ
+        batch = self.gpu_input[:len(frames)]
+        batch.fill_(114 / 255)
+
+        for i, frame in enumerate(frames):
+            if isinstance(frame, torch.Tensor):
+                # Already on the GPU as CHW RGB (nvJPEG decode)
+                h, w = frame.shape[1:]
+                x = frame.unsqueeze(0).float().div_(255)
+            else:
+                h, w = frame.shape[:2]
+
+                # One pinned staging buffer per batch slot, resized only on shape change
+                pinned = self.pinned_frames.get(i)
+                if pinned is None or pinned.shape != frame.shape:
+                    pinned = torch.empty(frame.shape, dtype=torch.uint8).pin_memory()
+                    self.pinned_frames[i] = pinned
+                pinned.copy_(torch.from_numpy(frame))
+
+                x = pinned.to('cuda', non_blocking=True)
+                x = x.permute(2, 0, 1).flip(0).unsqueeze(0).float().div_(255)
+
+            scale = min(size / h, size / w)
+            nh, nw = round(h * scale), round(w * scale)
+            top, left = (size - nh) // 2, (size - nw) // 2
+
+            batch[i, :, top:top + nh, left:left + nw] = F.interpolate(
+                x, size=(nh, nw), mode='bilinear', align_corners=False
+            )[0]
+
+        return batch
+
+    def _detect_batched(self, source, batch_size: int):
+        """
+        Run detection over (frame, meta) items from source in batches.
+
+        Args:
+            source: Iterable of (frame, meta) tuples; a None item flushes the
+                partially filled batch (e.g. on a stream read gap)
+            batch_size: Maximum frames per YOLO forward
+
+        Yields:
+            (frame, meta, detections) in input order
+        """
+        batch = []
+        for item in source:
+            if item is not None:
+                frame, meta = item
+                batch.append((frame, meta, self._has_motion(frame)))
+                if len(batch) < batch_size:
                     continue
+            if not batch:
+                continue
 
-                conf = float(box.conf[0])
-                bbox = box.xyxy[0].tolist()  # [x1, y1, x2, y2]
+            yield from self._detect_moving(batch)
+            batch = []
 
-                detections.append({
-                    'class': cls_name,
-                    'confidence': round(conf, 3),
-                    'bbox': [round(b, 1) for b in bbox],
-                    'class_id': cls_id
-                })
+        # Flush the tail (end of file / stop requested)
+        if batch:
+            yield from self._detect_moving(batch)
 
-                self.detection_count += 1
+    def _detect_moving(self, batch: list):
+        """
+        Run YOLO on the frames of a batch that passed the motion gate.
 
-        return detections
+        Args:
+            batch: List of (frame, meta, has_motion) tuples
+
+        Yields:
+            (frame, meta, detections) in input order; static frames get []
+        """
+        moving = [frame for frame, _, has_motion in batch if has_motion]
+        results = iter(self._detect_batch(moving) if moving else [])
+        for frame, meta, has_motion in batch:
+            yield frame, meta, next(results) if has_motion else []
+
+    def _has_motion(self, frame) -> bool:
+        """
+        Check a frame against the background model.
+
+        Args:
+            frame: OpenCV frame or CHW RGB uint8 CUDA tensor
+
+        Returns:
+            True if YOLO should run (always True when the gate is disabled)
+        """
+        if self.bg_subtractor is None:
+            return True
+
+        width, height = self.MOTION_SIZE
+        if isinstance(frame, torch.Tensor):
+            # Downsample on the GPU; channel order doesn't matter to MOG2
+            small = F.interpolate(
+                frame.unsqueeze(0).float(), size=(height, width), mode='area'
+            )[0].permute(1, 2, 0).byte().cpu().numpy()
+        else:
+            small = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+
+        mask = self.bg_subtractor.apply(small)
+        return cv2.countNonZero(mask) >= self.motion_threshold
 
-    def _create_episode_data(self, detections: list, frame) -> dict:
+    def _create_episode_data(self, detections: list, frame, frame_number: Optional[int] = None) -> dict:
         """
         Create a unified episode data structure.
 
         Args:
             detections: List of detection dictionaries
             frame: The OpenCV frame (for snapshot)
+            frame_number: Source frame number (defaults to the current frame count)
 
         Returns:
             Episode data dictionary
         """
-        timestamp = datetime.utcnow().isoformat() + 'Z'
+        timestamp = utc_timestamp()
 
         # Calculate frame dimensions
         height, width = frame.shape[:2]
@@ -757,33 +1402,30 @@ class SecureWatchDetector:
         # Build detection list with normalized coordinates
         detection_list = []
         for det in detections:
-            bbox = det['bbox']
             detection_list.append({
                 'label': det['class'],
                 'confidence': det['confidence'],
-                'bbox': bbox,
-                'bbox_normalized': [
-                    round(bbox[0] / width, 4),
-                    round(bbox[1] / height, 4),
-                    round(bbox[2] / width, 4),
-                    round(bbox[3] / height, 4)
-                ]
+                'bbox': det['bbox'],
+                'bbox_normalized': det['bbox_normalized']  # From _detect_batch
             })
 
         # Check if any person detected - include frame image if so
-        has_relevant = any(det['class'].lower() in ['person', 'car'] for det in detections)
+        has_relevant = not self.SNAPSHOT_CLASSES.isdisjoint(det['class_lower'] for det in detections)
         frame_base64 = None
-        if has_relevant:
+        if has_relevant and self._snapshot_changed(detections):
             # Draw bounding boxes on frame before encoding
-            frame_with_boxes = self._draw_bounding_boxes(frame.copy(), detections, width, height)
+            frame_with_boxes = self._draw_bounding_boxes(self._annotation_canvas(frame), detections, width, height)
             # Encode frame for person detections in live mode
-            frame_base64 = self._encode_frame_to_base64(frame_with_boxes)
+            snapshot_jpeg = self._encode_frame(frame_with_boxes)
+            frame_base64 = base64.b64encode(snapshot_jpeg).decode('ascii')
+            # Kept so a Telegram alert for this frame can reuse the JPEG
+            self.last_snapshot = (frame, detections, snapshot_jpeg)
 
         return {
             'type': 'detection',
             'mode': self.mode,
             'camera_id': self.cam_id,
-            'frame_number': self.frame_count,
+            'frame_number': frame_number if frame_number is not None else self.frame_count,
             'timestamp': timestamp,
             'frame_dimensions': {'width': width, 'height': height},
             'detections': detection_list,
@@ -793,54 +1435,158 @@ class SecureWatchDetector:
             'frame_image': frame_base64  # Base64 JPEG for person detections
         }
 
+    def _emit_detection_json(self, episode_data: dict):
+        """
+        Write a DETECTION_JSON line to stdout for Node.js to capture.
+
+        The line bypasses the sys.stdout buffers and goes out as a single
+        writev() syscall instead of separate payload/newline writes + flush.
+
+        Args:
+            episode_data: Episode data dictionary
+        """
+        parts = [b"DETECTION_JSON:", json_bytes(episode_data), b"\n"]
+        if not hasattr(os, 'writev'):
+            sys.stdout.buffer.write(b"".join(parts))
+            sys.stdout.buffer.flush()
+            return
+
+        # One gather write per line; loop only if a pipe accepts a partial write
+        fd = sys.stdout.fileno()
+        written = os.writev(fd, parts)
+        remaining = sum(len(p) for p in parts) - written
+        if remaining:
+            data = b"".join(parts)[-remaining:]
+            while data:
+                data = data[os.write(fd, data):]
+
     def _post_detection(self, data: dict):
         """
-        Send detection data via Redis (preferred) or HTTP POST (fallback).
+        Queue detection data for the background sender thread.
 
-        If Redis is connected:
-        - LPUSH to 'detection_queue' list for reliable processing
-        - PUBLISH to 'live_events' channel for real-time UI updates
+        Never blocks the detection loop; if the sender falls behind and the
+        queue is full the detection is dropped (stdout output is unaffected).
 
         Args:
             data: Episode data dictionary
         """
+        if not self.redis_client and not self.endpoint:
+            return
+        try:
+            self.post_queue.put_nowait(data)
+        except queue.Full:
+            print(f"[DetectEngine] Post queue full, dropping detection", file=sys.stderr)
+
+    def _start_post_thread(self):
+        """
+        Start the background thread that delivers queued detections.
+
+        Detections arriving within POST_BATCH_WAIT of each other are coalesced
+        so a burst costs one Redis round trip instead of two per detection.
+
+        The loop wakes at least every 0.5s, so it also writes the health
+        heartbeat (heartbeat:detector:<camera_id>, epoch ms) every
+        HEARTBEAT_INTERVAL seconds, in the same round trip as any pending
+        detections, and removes the key on shutdown.
+        """
+        def post_loop():
+            next_heartbeat = 0.0
+            while self.running or not self.post_queue.empty():
+                try:
+                    batch = [self.post_queue.get(timeout=0.5)]
+                except queue.Empty:
+                    batch = []
+
+                if batch:
+                    deadline = time.time() + self.POST_BATCH_WAIT
+                    while len(batch) < self.POST_BATCH_MAX:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            break
+                        try:
+                            batch.append(self.post_queue.get(timeout=remaining))
+                        except queue.Empty:
+                            break
+
+                now = time.monotonic()
+                heartbeat = self.redis_client is not None and now >= next_heartbeat
+                if heartbeat:
+                    next_heartbeat = now + self.HEARTBEAT_INTERVAL
+
+                if batch or heartbeat:
+                    self._deliver_detections(batch, heartbeat)
+
+            # Clean up heartbeat key on shutdown
+            if self.redis_client:
+                try:
+                    self.redis_client.delete(f"heartbeat:detector:{self.cam_id}")
+                    print(f"[DetectEngine] Heartbeat key removed on shutdown", file=sys.stderr)
+                except Exception:
+                    pass
+
+        self.post_thread = threading.Thread(target=post_loop, daemon=True)
+        self.post_thread.start()
+        print(f"[DetectEngine] Detection sender thread started", file=sys.stderr)
+
+    def _deliver_detections(self, batch: List[dict], heartbeat: bool = False):
+        """
+        Send a batch of detections via Redis (preferred) or HTTP POST (fallback).
+
+        If Redis is connected, the whole batch goes out as one LPUSH to the
+        'detection_queue' list. Node's BRPOP consumer handles these exactly
+        like 'live_events' messages, so publishing each payload there as well
+        only doubled the bytes sent and made Node process detections twice.
+
+        The HTTP endpoint accepts one detection per request, so the fallback
+        posts each item over a persistent keep-alive session.
+
+        Args:
+            batch: Episode data dictionaries in arrival order (may be empty)
+            heartbeat: Also write the heartbeat key in the same round trip
+        """
         # Prefer Redis if available
         if self.redis_client:
             try:
-                json_data = json.dumps(data)
-                # Push to queue for reliable processing
-                self.redis_client.lpush('detection_queue', json_data)
-                # Publish for real-time subscribers
-                self.redis_client.publish('live_events', json_data)
+                pipe = self.redis_client.pipeline(transaction=False)
+                if batch:
+                    # LPUSH a b c leaves a at the tail, so BRPOP keeps arrival order
+                    pipe.lpush('detection_queue', *(json_bytes(data) for data in batch))
+                if heartbeat:
+                    # Current timestamp in milliseconds since epoch
+                    pipe.set(f"heartbeat:detector:{self.cam_id}", str(int(time.time() * 1000)))
+                pipe.execute()
                 return
             except redis.RedisError as e:
                 print(f"[DetectEngine] Redis error: {e}", file=sys.stderr)
                 # Fall through to HTTP fallback
 
         # HTTP fallback
-        if not self.endpoint:
+        if not self.endpoint or not batch:
             return
 
-        try:
-            response = requests.post(
-                self.endpoint,
-                json=data,
-                timeout=5,
-                headers={'Content-Type': 'application/json'}
-            )
-            if response.status_code != 200:
-                print(f"[DetectEngine] POST failed: {response.status_code}",
-                      file=sys.stderr)
-        except requests.RequestException as e:
-            # Don't spam logs for connection errors in live mode
-            if self.mode == 'UPLOAD':
-                print(f"[DetectEngine] POST error: {e}", file=sys.stderr)
+        for data in batch:
+            try:
+                response = self.post_session.post(
+                    self.endpoint,
+                    data=json_bytes(data),
+                    timeout=5
+                )
+                if response.status_code != 200:
+                    print(f"[DetectEngine] POST failed: {response.status_code}",
+                          file=sys.stderr)
+            except requests.RequestException as e:
+                # Don't spam logs for connection errors in live mode
+                if self.mode == 'UPLOAD':
+                    print(f"[DetectEngine] POST error: {e}", file=sys.stderr)
 
     def _send_telegram_alert(self, frame, detections: list):
         """
-        Send a Telegram alert for high-confidence person detections.
+        Queue a Telegram alert for high-confidence person detections.
         Respects cooldown to prevent spam.
 
+        The caller checks the cooldown first; the image write and upload run
+        on the alert thread so Telegram latency never stalls detection.
+
         Args:
             frame: OpenCV frame (numpy array)
             detections: List of detection dictionaries
@@ -854,28 +1600,89 @@ class SecureWatchDetector:
         if current_time - self.last_alert_time < self.ALERT_COOLDOWN:
             return
 
-        # Find high-confidence person detections
-        for det in detections:
-            if det['class'].lower() == 'person' and det['confidence'] >= self.ALERT_CONFIDENCE_THRESHOLD:
+        # Find the most confident person detection
+        confidence = max(
+            (det['confidence'] for det in detections if det['class_lower'] == 'person'),
+            default=0.0
+        )
+        if confidence < self.ALERT_CONFIDENCE_THRESHOLD:
+            return
+
+        # Reuse the annotated JPEG _create_episode_data just made for this frame
+        snapshot_jpeg = None
+        snapshot = self.last_snapshot
+        if snapshot is not None and snapshot[0] is frame and snapshot[1] is detections:
+            snapshot_jpeg = snapshot[2]
+
+        try:
+            self.alert_queue.put_nowait((frame, detections, confidence, current_time, snapshot_jpeg))
+            # Start the cooldown now so later frames don't queue duplicates
+            self.last_alert_time = current_time
+        except queue.Full:
+            pass  # An alert is already being sent
+
+    def _start_alert_thread(self):
+        """
+        Start the background thread that saves alert images and sends them.
+        """
+        def alert_loop():
+            # Scratch frame owned by this thread; the detection thread may still
+            # be encoding the original, so boxes are never drawn on it directly
+            canvas = None
+
+            while self.running:
+                try:
+                    frame, detections, confidence, alert_time, snapshot_jpeg = self.alert_queue.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+
                 # Save frame to temp file
                 alert_dir = os.path.join(os.path.dirname(__file__), 'data', 'alerts')
                 os.makedirs(alert_dir, exist_ok=True)
-                alert_path = os.path.join(alert_dir, f"alert_{self.cam_id}_{int(current_time)}.jpg")
+                alert_path = os.path.join(alert_dir, f"alert_{self.cam_id}_{int(alert_time)}.jpg")
 
-                # Draw bounding boxes on frame before saving
-                frame_with_boxes = self._draw_bounding_boxes(frame.copy(), detections, frame.shape[1], frame.shape[0])
-                cv2.imwrite(alert_path, frame_with_boxes)
+                if snapshot_jpeg is not None:
+                    # Same annotated image the detection event carried
+                    with open(alert_path, 'wb') as f:
+                        f.write(snapshot_jpeg)
+                else:
+                    # Draw bounding boxes on frame before saving
+                    if canvas is None or canvas.shape != frame.shape:
+                        canvas = np.empty_like(frame)
+                    np.copyto(canvas, frame)
+                    frame_with_boxes = self._draw_bounding_boxes(canvas, detections, frame.shape[1], frame.shape[0])
+                    cv2.imwrite(alert_path, frame_with_boxes)
 
                 # Send Telegram alert
                 try:
-                    send_alert(alert_path, f"Person on {self.cam_id}", det['confidence'])
-                    self.last_alert_time = current_time
+                    send_alert(alert_path, f"Person on {self.cam_id}", confidence)
                     print(f"[DetectEngine] Telegram alert sent for {self.cam_id}", file=sys.stderr)
                 except Exception as e:
                     print(f"[DetectEngine] Telegram alert failed: {e}", file=sys.stderr)
+                    # Let the next qualifying frame retry instead of waiting out the cooldown
+                    self.last_alert_time = 0
 
-                # Only send one alert per cooldown period
-                break
+        self.alert_thread = threading.Thread(target=alert_loop, daemon=True)
+        self.alert_thread.start()
+
+    def _annotation_canvas(self, frame) -> np.ndarray:
+        """
+        Copy a frame into the reusable annotation buffer.
+
+        Detection snapshots are encoded right after drawing, so one buffer
+        (reallocated only when the frame size changes) replaces a fresh
+        frame.copy() per detection. Only used from the detection thread.
+
+        Args:
+            frame: OpenCV frame (numpy array)
+
+        Returns:
+            Buffer holding a copy of the frame, safe to draw on
+        """
+        if self.annotate_buf is None or self.annotate_buf.shape != frame.shape:
+            self.annotate_buf = np.empty_like(frame)
+        np.copyto(self.annotate_buf, frame)
+        return self.annotate_buf
 
     def _draw_bounding_boxes(self, frame, detections, width: int, height: int):
         """
@@ -883,70 +1690,180 @@ class SecureWatchDetector:
 
         Args:
             frame: OpenCV frame (numpy array)
-            detections: List of detection dictionaries with 'class', 'confidence', 'bbox'
-            width: Frame width (unused - bbox already in pixels)
-            height: Frame height (unused - bbox already in pixels)
+            detections: List of detection dictionaries with 'class_id',
+                'class_lower', 'confidence', 'bbox'
+            width: Frame width (boxes are clipped to it)
+            height: Frame height (boxes are clipped to it)
 
         Returns:
             Frame with bounding boxes drawn
         """
-        # Colors for different classes (BGR format)
-        colors = {
-            'person': (0, 255, 0),    # Green
-            'car': (255, 165, 0),     # Orange
-            'truck': (255, 0, 0),     # Blue
-            'motorcycle': (255, 255, 0),  # Cyan
-            'bicycle': (0, 255, 255),  # Yellow
-            'bus': (128, 0, 128),     # Purple
-        }
-        default_color = (0, 255, 0)  # Green default
-
-        for det in detections:
-            cls = det.get('class', '').lower()
-            conf = det.get('confidence', 0)
-            bbox = det.get('bbox', [])
-
-            if len(bbox) != 4:
-                continue
+        # Pull fields out once; skip malformed boxes
+        detections = [det for det in detections if len(det.get('bbox', [])) == 4]
+        if not detections:
+            return frame
 
-            # bbox is already in pixel coordinates [x1, y1, x2, y2]
-            x1 = int(bbox[0])
-            y1 = int(bbox[1])
-            x2 = int(bbox[2])
-            y2 = int(bbox[3])
+        # bbox is already in pixel coordinates [x1, y1, x2, y2]; truncate and
+        # clip all boxes to the frame in one go
+        bboxes = np.asarray([det['bbox'] for det in detections], dtype=np.float64).astype(np.int32)
+        np.clip(bboxes, 0, [width - 1, height - 1, width - 1, height - 1], out=bboxes)
+        classes = [det['class_lower'] for det in detections]
+        colors = [self.class_colors[det['class_id']] for det in detections]
+        confs = [det.get('confidence', 0) for det in detections]
 
-            # Get color for this class
-            color = colors.get(cls, default_color)
+        for (x1, y1, x2, y2), cls, color, conf in zip(bboxes.tolist(), classes, colors, confs):
 
             # Draw rectangle with thicker line
             cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3)
 
-            # Draw label background
-            label = f"{cls} {conf:.0%}"
-            (label_w, label_h), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
-            cv2.rectangle(frame, (x1, y1 - label_h - 10), (x1 + label_w + 6, y1), color, -1)
-
-            # Draw label text
-            cv2.putText(frame, label, (x1 + 3, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+            # Blit the pre-rendered label (background + text) above the box,
+            # clipped to the frame like cv2 drawing would be
+            tile = self._label_tile(f"{cls} {conf:.0%}", color)
+            tile_h, tile_w = tile.shape[:2]
+            top = y1 - tile_h + 1
+            y0 = max(top, 0)
+            x_end = min(x1 + tile_w, width)
+            if x_end > x1:
+                frame[y0:y1 + 1, x1:x_end] = tile[y0 - top:, :x_end - x1]
 
         return frame
 
-    def _encode_frame_to_base64(self, frame) -> str:
+    def _label_tile(self, label: str, color) -> np.ndarray:
         """
-        Encode an OpenCV frame to base64 JPEG string.
+        Rendered label (filled background + text), cached per label/color.
+
+        Labels repeat (class + whole percent), so after warm-up each box label
+        is a slice copy instead of getTextSize + rectangle + putText.
+
+        Returns:
+            BGR tile whose bottom row sits on the box's top edge
+        """
+        key = (label, color)
+        tile = self.label_tiles.get(key)
+        if tile is None:
+            (label_w, label_h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+            tile = np.empty((label_h + 11, label_w + 7, 3), dtype=np.uint8)
+            tile[:] = color
+            cv2.putText(tile, label, (3, label_h + 5), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+            self.label_tiles[key] = tile
+        return tile
+
+    def _encode_frame(self, frame):
+        """
+        Encode an OpenCV frame to JPEG bytes.
+
+        Episode buffers hold these instead of raw frames (~20-50x smaller),
+        and _serialize_episode base64s them without re-encoding.
 
         Args:
             frame: OpenCV frame (numpy array)
 
         Returns:
-            Base64 encoded JPEG string
+            JPEG encoded bytes-like object (bytes, or a memoryview over the
+            cv2.imencode buffer to skip a tobytes() copy)
         """
-        # Encode frame as JPEG
-        encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 85]
+        if self.turbojpeg is not None:
+            if not hasattr(self.turbojpeg, 'buffer_size'):
+                # PyTurboJPEG < 1.7 has no in-place encode
+                return self.turbojpeg.encode(
+                    frame, quality=self.JPEG_QUALITY,
+                    pixel_format=TJPF_BGR, jpeg_subsample=TJSAMP_420
+                )
+
+            # Compress into the reused scratch buffer, then copy out only the
+            # bytes written: callers keep the result, so it can't alias scratch
+            needed = self.turbojpeg.buffer_size(frame, TJSAMP_420)
+            if self.jpeg_scratch is None or self.jpeg_scratch.size < needed:
+                self.jpeg_scratch = np.empty(needed, dtype=np.uint8)
+            _, size = self.turbojpeg.encode(
+                frame, quality=self.JPEG_QUALITY,
+                pixel_format=TJPF_BGR, jpeg_subsample=TJSAMP_420,
+                dst=self.jpeg_scratch
+            )
+            return self.jpeg_scratch[:size].tobytes()
+
+        encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), self.JPEG_QUALITY]
         _, buffer = cv2.imencode('.jpg', frame, encode_param)
+        return memoryview(buffer).cast('B')
+
+    def _accumulate_summary(self, detections: list, summary: Counter):
+        """
+        Add a frame's detections to an episode's per-class counts.
+
+        Args:
+            detections: List of detection dictionaries
+            summary: Counter of class name -> detections, updated in place
+        """
+        summary.update(det['class'] for det in detections)
+
+    def _snapshot_changed(self, detections: list) -> bool:
+        """
+        Decide whether a detection event needs a fresh frame_image.
+
+        Boxes are compared on a 10 px grid; an unchanged set seen again
+        within SNAPSHOT_REPEAT_INTERVAL of the last snapshot is sent without
+        an image (the detection JSON itself still goes out).
+
+        Args:
+            detections: List of detection dictionaries
+
+        Returns:
+            True if the frame should be drawn and encoded
+        """
+        sig = tuple(sorted(
+            (det['class'], round(det['bbox'][0], -1), round(det['bbox'][1], -1))
+            for det in detections
+        ))
+        now = time.monotonic()
+        if sig == self.last_snapshot_sig and now - self.last_snapshot_time < self.SNAPSHOT_REPEAT_INTERVAL:
+            return False
+        self.last_snapshot_sig = sig
+        self.last_snapshot_time = now
+        return True
+
+    def _pack_detections(self, detections: list) -> Dict[str, np.ndarray]:
+        """
+        Pack a frame's detections into compact per-field arrays.
+
+        Episode buffers hold up to a few hundred frames; one small array per
+        field is far lighter than a dict per detection. Expanded back to the
+        JSON shape by _unpack_detections at send time.
+
+        Args:
+            detections: List of detection dictionaries from _detect_batch
+
+        Returns:
+            Dict with 'class_ids' (int16), 'confidences' (float32, N) and
+            'bboxes' (float32, N x 4, pixel [x1, y1, x2, y2])
+        """
+        return {
+            'class_ids': np.array([det['class_id'] for det in detections], dtype=np.int16),
+            'confidences': np.array([det['confidence'] for det in detections], dtype=np.float32),
+            'bboxes': np.array([det['bbox'] for det in detections], dtype=np.float32).reshape(-1, 4)
+        }
+
+    def _unpack_detections(self, packed: Optional[Dict[str, np.ndarray]]) -> List[dict]:
+        """
+        Expand packed detection arrays into the episode 'bbox' list.
+
+        Values are widened back to float64 and re-rounded so float32 storage
+        doesn't leak digits like 0.8100000023841858 into the JSON.
+
+        Args:
+            packed: Output of _pack_detections (None for no detections)
 
-        # Convert to base64
-        return base64.b64encode(buffer).decode('utf-8')
+        Returns:
+            List of {'label', 'confidence', 'bbox'} dictionaries
+        """
+        if packed is None:
+            return []
+        names = self.class_id_to_name
+        confs = np.round(packed['confidences'].astype(np.float64), 3).tolist()
+        bboxes = np.round(packed['bboxes'].astype(np.float64), 1).tolist()
+        return [
+            {'label': names[cls_id], 'confidence': conf, 'bbox': bbox}
+            for cls_id, conf, bbox in zip(packed['class_ids'].tolist(), confs, bboxes)
+        ]
 
     def _serialize_episode(
         self,
@@ -960,9 +1877,9 @@ class SecureWatchDetector:
 
         Args:
             frames: List of frame dictionaries, each containing:
-                - 'image': OpenCV frame (numpy array)
+                - 'image_jpeg': JPEG encoded frame bytes
                 - 'seq': Sequence number
-                - 'detections': List of detection bboxes for this frame
+                - 'detections': Packed detection arrays (see _pack_detections)
                 - 'timestamp': Frame timestamp
             detections_summary: Aggregated detection counts, e.g. {"person": 3, "car": 1}
 
@@ -982,8 +1899,8 @@ class SecureWatchDetector:
         for i, frame_data in enumerate(frames):
             frame_entry = {
                 'seq': frame_data.get('seq', i),
-                'image': self._encode_frame_to_base64(frame_data['image']),
-                'bbox': frame_data.get('detections', [])
+                'image': base64.b64encode(frame_data['image_jpeg']).decode('ascii'),
+                'bbox': self._unpack_detections(frame_data.get('detections'))
             }
             serialized_frames.append(frame_entry)
 
@@ -991,10 +1908,10 @@ class SecureWatchDetector:
         episode_payload = {
             'source_type': 'live_stream' if self.mode == 'LIVE' else 'file_upload',
             'camera_id': self.cam_id,
-            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'timestamp': utc_timestamp(),
             'duration_sec': round(duration_sec, 3),
             'frames': serialized_frames,
-            'yolo_detections': detections_summary
+            'yolo_detections': dict(detections_summary)
         }
 
         return episode_payload
@@ -1018,15 +1935,15 @@ class SecureWatchDetector:
             # Serialize the episode
             payload = self._serialize_episode(frames, detections_summary)
             payload['type'] = 'episode'  # Mark as episode for Node.js
+            # Encoded once; the HTTP fallback sends the same bytes
+            json_data = json_bytes(payload)
 
             # Prefer Redis if available
             if self.redis_client:
                 try:
-                    json_data = json.dumps(payload)
-                    # Push to queue for reliable processing
+                    # Push to queue for reliable processing (Node's queue
+                    # consumer also does the real-time fan-out)
                     self.redis_client.lpush('detection_queue', json_data)
-                    # Publish for real-time subscribers
-                    self.redis_client.publish('live_events', json_data)
                     print(f"[DetectEngine] Episode sent via Redis: "
                           f"{len(frames)} frames, {sum(detections_summary.values())} detections",
                           file=sys.stderr)
@@ -1042,11 +1959,10 @@ class SecureWatchDetector:
                 return False
 
             # POST to Node.js endpoint
-            response = requests.post(
+            response = self.post_session.post(
                 self.endpoint,
-                json=payload,
-                timeout=3,
-                headers={'Content-Type': 'application/json'}
+                data=json_data,
+                timeout=3
             )
 
             if response.status_code == 200:
@@ -1072,50 +1988,23 @@ class SecureWatchDetector:
             print(f"[DetectEngine] Unexpected error sending episode: {e}", file=sys.stderr)
             return False
 
-    def _start_heartbeat_thread(self):
-        """
-        Start the heartbeat thread for health monitoring.
-        Writes timestamp to Redis every HEARTBEAT_INTERVAL seconds.
-        Key format: heartbeat:detector:<camera_id>
-        """
-        if not self.redis_client:
-            print(f"[DetectEngine] Heartbeat disabled - no Redis connection", file=sys.stderr)
-            return
-
-        def heartbeat_loop():
-            heartbeat_key = f"heartbeat:detector:{self.cam_id}"
-            print(f"[DetectEngine] Heartbeat thread started for {heartbeat_key}", file=sys.stderr)
-
-            while self.running:
-                try:
-                    # Write current timestamp (milliseconds since epoch)
-                    timestamp_ms = int(time.time() * 1000)
-                    self.redis_client.set(heartbeat_key, str(timestamp_ms))
-                except redis.RedisError as e:
-                    print(f"[DetectEngine] Heartbeat write failed: {e}", file=sys.stderr)
-                except Exception as e:
-                    print(f"[DetectEngine] Heartbeat error: {e}", file=sys.stderr)
-
-                # Sleep for the heartbeat interval
-                time.sleep(self.HEARTBEAT_INTERVAL)
-
-            # Clean up heartbeat key on shutdown
-            try:
-                self.redis_client.delete(heartbeat_key)
-                print(f"[DetectEngine] Heartbeat key removed on shutdown", file=sys.stderr)
-            except Exception:
-                pass
-
-        self.heartbeat_thread = threading.Thread(target=heartbeat_loop, daemon=True)
-        self.heartbeat_thread.start()
-
     def _cleanup(self):
         """
         Clean up resources.
         """
         self.running = False
+        self.stop_event.set()
+        owns_cap = self._stop_capture_thread()
+        # Let the sender drain detections still in the queue
+        if self.post_thread is not None:
+            self.post_thread.join(timeout=10)
+            self.post_thread = None
+        if self.post_session is not None:
+            self.post_session.close()
+            self.post_session = None
         if self.cap is not None:
-            self.cap.release()
+            if owns_cap:
+                self.cap.release()
             self.cap = None
         print(f"[DetectEngine] Cleanup complete", file=sys.stderr)
 
@@ -1125,13 +2014,15 @@ class SecureWatchDetector:
         """
         print(f"[DetectEngine] Stop requested", file=sys.stderr)
         self.running = False
+        self.stop_event.set()
 
     def _handle_signal(self, signum, frame):
         """
         Handle OS signals for graceful shutdown.
 
         When Node.js kills the process (SIGTERM) or user presses Ctrl+C (SIGINT),
-        this handler ensures the camera is released and resources are cleaned up.
+        this handler stops the loops and exits; start()'s finally block then runs
+        _cleanup, which stops the capture thread before releasing the camera.
 
         Args:
             signum: Signal number received
@@ -1141,16 +2032,13 @@ class SecureWatchDetector:
         print(f"[DetectEngine] Received signal {signal_name} ({signum}), shutting down...",
               file=sys.stderr)
 
-        # Set running flag to false to stop loops
+        # Set running flag to false to stop loops and wake sleeping threads
         self.running = False
+        self.stop_event.set()
 
-        # Release camera capture if open
-        if self.cap:
-            print(f"[DetectEngine] Releasing camera capture...", file=sys.stderr)
-            self.cap.release()
-            self.cap = None
-
-        print(f"[DetectEngine] Graceful shutdown complete. "
+        # The capture is not released here: the capture thread may be inside
+        # grab()/retrieve(), so _cleanup stops it first
+        print(f"[DetectEngine] Signal handled. "
               f"Processed {self.frame_count} frames, {self.detection_count} detections.",
               file=sys.stderr)
 
@@ -1221,6 +2109,36 @@ Examples:
         help='HTTP auth password (for HTTP mode with Digest auth)'
     )
 
+    parser.add_argument(
+        '--precision',
+        choices=['fp32', 'fp16', 'int8'],
+        default=SecureWatchDetector.DEFAULT_PRECISION,
+        help=f'Inference precision; fp16/int8 use a cached TensorRT engine when '
+             f'TensorRT is installed (delete <engine>.failed to retry a failed '
+             f'export) (default: {SecureWatchDetector.DEFAULT_PRECISION})'
+    )
+
+    parser.add_argument(
+        '--calib-data',
+        default=None,
+        help='Dataset yaml with representative frames for INT8 calibration '
+             '(required with --precision int8)'
+    )
+
+    parser.add_argument(
+        '--gstreamer',
+        action='store_true',
+        help='LIVE mode: decode RTSP with a GStreamer NVDEC pipeline (needs OpenCV built with GStreamer)'
+    )
+
+    parser.add_argument(
+        '--motion-threshold',
+        type=int,
+        default=0,
+        help='Skip YOLO on frames with fewer moving pixels than this at 320x180 '
+             '(0 = disabled; ~200 suits most fixed cameras)'
+    )
+
     parser.add_argument(
         '--redis-host',
         default=None,
@@ -1234,10 +2152,17 @@ Examples:
         help='Redis server port (default: 6379)'
     )
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.precision == 'int8' and not args.calib_data:
+        parser.error("--precision int8 needs --calib-data")
+    return args
 
 
 if __name__ == "__main__":
+    # Detection lines are written straight to fd 1; anything else printed to
+    # stdout goes out whole lines at a time without explicit flushes
+    sys.stdout.reconfigure(line_buffering=True)
+
     args = parse_args()
 
     detector = SecureWatchDetector(
@@ -1249,7 +2174,11 @@ if __name__ == "__main__":
         username=args.username,
         password=args.password,
         redis_host=getattr(args, 'redis_host', None),
-        redis_port=getattr(args, 'redis_port', 6379)
+        redis_port=getattr(args, 'redis_port', 6379),
+        precision=args.precision,
+        calib_data=args.calib_data,
+        gstreamer=args.gstreamer,
+        motion_threshold=args.motion_threshold
     )
 
     detector.start()
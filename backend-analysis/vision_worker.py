@@ -4,125 +4,524 @@ import json
 import redis
 import argparse
 import os
-import uuid
+import re
+import secrets
 import threading
+import subprocess
+import queue
+import logging
+import socket
+import numpy as np
+import torch
+import torch.nn.functional as F
 from ultralytics import YOLO
+from ultralytics.utils import ops
 from datetime import datetime
 
+# orjson when installed; the writer thread serializes every payload
+try:
+    import orjson
+    dumps = orjson.dumps
+except ImportError:
+    dumps = json.dumps
+
+logging.basicConfig(level=logging.INFO, format="[v2-Eye] %(message)s")
+log = logging.getLogger("v2eye")
+
 # Force TCP for RTSP (must be before any cv2 operations)
 os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp"
 
 RAM_DISK_PATH = "/home/dd/securewatch3/v2_images"
 REDIS_CHANNEL = "v2:detections"
 
+# NVDEC hardware decode via an ffmpeg pipe (--hwdecode). Use nvv4l2decoder on
+# Jetson or h264_rkmpp on RK3588 by overriding V2_HW_DECODER.
+HW_DECODER = os.environ.get("V2_HW_DECODER", "h264_cuvid")
+
+# Reconnect delay after a lost stream: doubles per failed attempt, resets on success
+RECONNECT_MIN = 0.5
+RECONNECT_MAX = 30
+
+# Batches waiting for JPEG write + publish; batches are dropped rather than
+# stalling inference
+WRITER_QUEUE_SIZE = 16
+JPEG_QUALITY = 85
+
+# Dummy forwards at startup (kernel JIT, cuDNN autotune, TRT context)
+WARMUP_RUNS = 5
+
+# TensorRT engine export (engines are tied to the GPU + TRT version that built them)
+ENGINE_IMGSZ = 640
+
+def probe_size(url):
+    """Return (width, height) of the first video stream via ffprobe."""
+    out = subprocess.check_output([
+        "ffprobe", "-v", "error", "-rtsp_transport", "tcp",
+        "-select_streams", "v:0", "-show_entries", "stream=width,height",
+        "-of", "csv=p=0:s=x", url
+    ], timeout=15)
+    width, height = out.decode().strip().split("x")[:2]
+    return int(width), int(height)
+
 class FreshFrame:
-    def __init__(self, url):
-        self.cap = cv2.VideoCapture(url)
-        self.lock = threading.Lock()
-        self.frame = None
-        self.success = False
+    def __init__(self, url, frame_ready, hwdecode=False):
+        self.url = url
+        self.hwdecode = hwdecode
+        self.cap = None
+        self.proc = None
+        self.frame_bytes = None
+        # Single-slot SPSC handoff: the reader overwrites (seq, frame) as one
+        # reference (atomic under the GIL); seq tells the loop a frame is new
+        self._latest = (0, None)
         self.running = True
-        
-        if not self.cap.isOpened():
-            print(f"[v2-Eye] Failed to open {url}")
-            return
+        self.need_frame = threading.Event()
+        # Shared by every reader, so the main loop waits once for any camera
+        self.frame_ready = frame_ready
+
+        if hwdecode:
+            # A failed probe is retried by the reader with backoff
+            self._open_ffmpeg()
+        else:
+            self.cap = cv2.VideoCapture(url)
+            if not self.cap.isOpened():
+                # The reader keeps retrying with backoff
+                log.warning(f"Failed to open {url}")
 
         self.thread = threading.Thread(target=self._reader)
         self.thread.daemon = True
         self.thread.start()
-        print(f"[v2-Eye] FreshFrame thread started")
+        log.info("FreshFrame thread started")
+
+    def _open_ffmpeg(self):
+        """Probe the frame size (once) and start ffmpeg."""
+        if self.frame_bytes is None:
+            try:
+                self.width, self.height = probe_size(self.url)
+            except (subprocess.SubprocessError, OSError, ValueError) as e:
+                log.warning(f"ffprobe failed for {self.url}: {e}")
+                return
+            self.frame_bytes = self.width * self.height * 3
+            log.info(f"NVDEC decode ({HW_DECODER}) {self.width}x{self.height}")
+        self._spawn_ffmpeg()
+
+    def _stop_ffmpeg(self):
+        # Close our end of the pipe and reap the process, so a respawn
+        # leaks neither the fd nor a zombie
+        self.proc.stdout.close()
+        self.proc.kill()
+        self.proc.wait()
+        self.proc = None
+
+    def _spawn_ffmpeg(self):
+        if self.proc is not None:
+            self._stop_ffmpeg()
+        self.proc = subprocess.Popen([
+            "ffmpeg", "-loglevel", "error",
+            "-hwaccel", "cuda", "-c:v", HW_DECODER,
+            "-rtsp_transport", "tcp", "-i", self.url,
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-"
+        ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=10**8)
+
+    def _read_frame(self, want):
+        if not self.hwdecode:
+            # grab() just advances the stream; only pay for retrieve()
+            # (BGR conversion + copy) when the main loop is waiting on a frame
+            if not self.cap.grab():
+                return False, None
+            if not want:
+                return True, None
+            return self.cap.retrieve()
+
+        if self.proc is None:
+            # Not probed yet
+            return False, None
+        # The ffmpeg pipe has to be drained every frame regardless
+        raw = self.proc.stdout.read(self.frame_bytes)
+        if len(raw) != self.frame_bytes:
+            return False, None
+        return True, np.frombuffer(raw, np.uint8).reshape(self.height, self.width, 3)
+
+    def _reconnect(self):
+        if self.hwdecode:
+            # A short read means ffmpeg is exiting (stream lost); replace it
+            self._open_ffmpeg()
+        else:
+            # Free the FFmpeg context before reopening on the same VideoCapture
+            self.cap.release()
+            self.cap.open(self.url)
 
     def _reader(self):
+        seq = 0
+        backoff = RECONNECT_MIN
         while self.running:
-            success, frame = self.cap.read()
+            success, frame = self._read_frame(self.need_frame.is_set())
             if not success:
-                time.sleep(1)
+                log.warning(f"Stream lost for {self.url}, reconnecting in {backoff:g}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, RECONNECT_MAX)
+                self._reconnect()
                 continue
-            with self.lock:
-                self.frame = frame
-                self.success = success
+            backoff = RECONNECT_MIN
+            if frame is None:
+                continue
+            seq += 1
+            self._latest = (seq, frame)
+            self.need_frame.clear()
+            self.frame_ready.set()
+
+    @property
+    def alive(self):
+        return self.thread.is_alive()
 
     def read(self):
-        with self.lock:
-            return self.success, self.frame
-            
+        """Return the newest (seq, frame) without blocking."""
+        return self._latest
+
     def release(self):
         self.running = False
-        self.cap.release()
+        if self.proc is not None:
+            # The reader sees EOF and exits; reap so no zombie is left
+            self.proc.kill()
+            self.proc.wait()
+        if self.cap is not None:
+            self.cap.release()
+
+class PinnedInput:
+    """Stage raw frames in pinned host memory, DMA them to the GPU and letterbox
+    them there, so the model skips its own per-call CPU preprocessing.
+
+    With pad=True every call returns the full `batch` (unused slots stay grey)
+    so a static-shape torch.compile graph never recompiles for a smaller
+    batch; restore() only maps the results that have a frame."""
+
+    def __init__(self, imgsz=ENGINE_IMGSZ, batch=1, half=False, pad=False):
+        self.imgsz = imgsz
+        self.pad = pad
+        dtype = torch.float16 if half else torch.float32
+        self.gpu = torch.empty((batch, 3, imgsz, imgsz), dtype=dtype, device="cuda")
+        # Pinned uint8 staging buffers, one per batch slot (cameras may differ in size)
+        self.staging = {}
+
+    def _stage(self, i, frame):
+        buf = self.staging.get(i)
+        if buf is None or buf.shape != frame.shape:
+            buf = torch.empty(frame.shape, dtype=torch.uint8).pin_memory()
+            self.staging[i] = buf
+        buf.copy_(torch.from_numpy(frame))
+        return buf.to("cuda", non_blocking=True)
+
+    def __call__(self, frames):
+        gpu = self.gpu if self.pad else self.gpu[:len(frames)]
+        gpu.fill_(114)
+
+        for i, frame in enumerate(frames):
+            h, w = frame.shape[:2]
+            scale = min(self.imgsz / h, self.imgsz / w)
+            nh, nw = round(h * scale), round(w * scale)
+            top, left = (self.imgsz - nh) // 2, (self.imgsz - nw) // 2
+
+            # HWC BGR uint8 -> 1xCHW RGB, resized on the GPU into the letterbox
+            x = self._stage(i, frame).permute(2, 0, 1).flip(0).unsqueeze(0).to(gpu.dtype)
+            x = F.interpolate(x, size=(nh, nw), mode="bilinear", align_corners=False)
+            gpu[i, :, top:top + nh, left:left + nw] = x[0]
+
+        return gpu.div_(255)
+
+    def restore(self, results, frames):
+        """Map boxes from the letterboxed tensors back onto the original frames."""
+        for result, frame in zip(results, frames):
+            result.orig_img = frame
+            result.orig_shape = frame.shape[:2]
+            boxes = result.boxes.data.clone()
+            boxes[:, :4] = ops.scale_boxes((self.imgsz, self.imgsz), boxes[:, :4], frame.shape)
+            result.update(boxes=boxes)
+        return results
+
+def compile_model(model, batch, half=False):
+    """torch.compile the network the predictor actually runs.
+
+    AutoBackend fuses the model when the predictor is built, which unwraps a
+    module compiled beforehand. So fuse first, build the predictor with one
+    call, then compile predictor.model.model in place; warmup_model() then
+    pays the compile cost with the real batch size and dtype. The graph is
+    static, so run_worker pads every batch to `batch` (PinnedInput(pad=True))."""
+    model.model.fuse()
+    dummy = [np.zeros((ENGINE_IMGSZ, ENGINE_IMGSZ, 3), dtype=np.uint8)] * batch
+    model(dummy, imgsz=ENGINE_IMGSZ, half=half, verbose=False)
+    backend = model.predictor.model
+    backend.model = torch.compile(backend.model, mode="max-autotune",
+                                  fullgraph=False, dynamic=False)
+    log.info("torch.compile(max-autotune), first forward compiles (~1 min)")
+
+def load_model(model_name, int8=False, calib_data=None, batch=1, compile=False, half=False):
+    """Load YOLO as a TensorRT engine, exporting it once next to the .pt file.
 
-def run_worker(camera_id, rtsp_url, model_name="yolo11n.pt", redis_host="localhost"):
-    print(f"[v2-Eye] Starting Vision Worker for {camera_id}")
-    print(f"[v2-Eye] Mode: PERSON ONLY, 70% confidence")
-    r = redis.Redis(host=redis_host, port=6379, decode_responses=True)
-    model = YOLO(model_name)
+    The cache name carries the input size and GPU (engines only run on the GPU
+    that built them). Falls back to the PyTorch weights if export fails (no
+    GPU / no TensorRT), optionally wrapped in torch.compile; a failed export
+    leaves a .failed marker so restarts skip it until the weights change.
+
+    Returns (model, compiled).
+    """
+    def fallback():
+        model = YOLO(model_name)
+        if compile and torch.cuda.is_available():
+            compile_model(model, batch, half=half)
+            return model, True
+        return model, False
+
+    if not torch.cuda.is_available():
+        log.info("No CUDA device, using PyTorch weights")
+        return fallback()
+
+    gpu = re.sub(r"[^A-Za-z0-9]+", "-", torch.cuda.get_device_name(0)).strip("-").lower()
+    stem = f"{os.path.splitext(model_name)[0]}-{ENGINE_IMGSZ}-{gpu}"
+    if batch > 1:
+        stem = f"{stem}-b{batch}"
+    engine_path = f"{stem}-int8.engine" if int8 else f"{stem}.engine"
+    failed_path = f"{engine_path}.failed"
+
+    if not os.path.exists(engine_path):
+        if os.path.exists(failed_path) and (
+                not os.path.exists(model_name) or
+                os.path.getmtime(failed_path) >= os.path.getmtime(model_name)):
+            log.info(f"TensorRT export failed previously ({failed_path}), "
+                     f"using PyTorch weights")
+            return fallback()
+        log.info(f"Exporting {model_name} -> {engine_path} (one-time)")
+        try:
+            export_args = dict(format="engine", half=not int8, imgsz=ENGINE_IMGSZ,
+                               device=0, dynamic=batch > 1, batch=batch)
+            if int8:
+                # Calibration dataset yaml pointing at representative frames
+                export_args.update(int8=True, data=calib_data)
+            exported = YOLO(model_name).export(**export_args)
+            if exported and os.path.abspath(exported) != os.path.abspath(engine_path):
+                os.replace(exported, engine_path)
+        except Exception as e:
+            log.warning(f"TensorRT export failed, using PyTorch weights: {e}")
+            try:
+                with open(failed_path, "w") as f:
+                    f.write(f"{e}\n")
+            except OSError:
+                pass
+            return fallback()
+
+    log.info(f"Using TensorRT engine {engine_path}")
+    return YOLO(engine_path, task="detect"), False
+
+def warmup_model(model, preprocess, batch, half=False):
+    """Run a few dummy batches so the first real frames see steady-state latency."""
+    dummy = [np.zeros((ENGINE_IMGSZ, ENGINE_IMGSZ, 3), dtype=np.uint8)] * batch
+    for _ in range(WARMUP_RUNS):
+        inputs = preprocess(dummy) if preprocess is not None else dummy
+        model(inputs, imgsz=ENGINE_IMGSZ, half=half, verbose=False, conf=0.40, classes=[0])
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    log.info(f"Model warmed up ({WARMUP_RUNS} runs, batch {batch})")
+
+def write_jpeg(path, img):
+    """Encode img and write it to path. Returns False on failure."""
+    try:
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        if not ok:
+            log.warning(f"Failed to encode {path}")
+            return False
+        # Straight to the fd - skips imwrite's codec/file dispatch
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, buf)
+        finally:
+            os.close(fd)
+        return True
+    except Exception as e:
+        log.warning(f"Failed to write {path}: {e}")
+        return False
+
+def start_image_writer(r):
+    """Write annotated frames, then publish them, on a daemon thread off the
+    inference loop.
+
+    Queue items are [(path, img, payloads), ...], one list per batch, sent in
+    one pipeline. Payloads are only queued once their image is on disk, so a
+    subscriber never gets a path before the file exists."""
+    writer_q = queue.Queue(maxsize=WRITER_QUEUE_SIZE)
+
+    def _writer():
+        while True:
+            images = writer_q.get()
+            pipe = r.pipeline(transaction=False)
+            for path, img, payloads in images:
+                if not write_jpeg(path, img):
+                    continue
+                for payload in payloads:
+                    pipe.publish(REDIS_CHANNEL, dumps(payload))
+            if not len(pipe):
+                continue
+            try:
+                pipe.execute()
+            except redis.RedisError as e:
+                log.warning(f"Redis publish failed: {e}")
+
+    threading.Thread(target=_writer, daemon=True).start()
+    return writer_q
+
+def make_redis_pool(redis_host, max_connections):
+    """Shared pool with TCP keepalive so idle connections skip a re-handshake."""
+    keepalive_options = {}
+    for opt, value in (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3)):
+        if hasattr(socket, opt):
+            keepalive_options[getattr(socket, opt)] = value
+    return redis.ConnectionPool(host=redis_host, port=6379, decode_responses=False,
+                                max_connections=max_connections, socket_keepalive=True,
+                                socket_keepalive_options=keepalive_options)
+
+def run_worker(camera_ids, rtsp_urls, model_name="yolo11n.pt", redis_host="localhost",
+               int8=False, calib_data=None, hwdecode=False, compile=False):
+    log.info(f"Starting Vision Worker for {', '.join(camera_ids)}")
+    log.info("Mode: PERSON ONLY, 70% confidence")
+    r = redis.Redis(connection_pool=make_redis_pool(redis_host, len(camera_ids) + 1))
+    # FP16 on GPU; INT8 engines keep an FP32 input binding
+    half = torch.cuda.is_available() and not int8
+    model, compiled = load_model(model_name, int8=int8, calib_data=calib_data,
+                                 batch=len(camera_ids), compile=compile, half=half)
+    writer_q = start_image_writer(r)
+    preprocess = (PinnedInput(batch=len(camera_ids), half=half, pad=compiled)
+                  if torch.cuda.is_available() else None)
+    warmup_model(model, preprocess, len(camera_ids), half=half)
     
-    cap = FreshFrame(rtsp_url)
-    print(f"[v2-Eye] Connected to {rtsp_url}")
-    last_heartbeat = 0
-    last_debug = 0
+    # One reader thread per camera, one batched forward for all of them
+    frame_ready = threading.Event()
+    caps = [FreshFrame(url, frame_ready, hwdecode=hwdecode) for url in rtsp_urls]
+    for url in rtsp_urls:
+        log.info(f"Connected to {url}")
+    last_seq = [0] * len(caps)
+    last_heartbeat = {camera_id: float("-inf") for camera_id in camera_ids}
+    last_debug = float("-inf")
+    detections_since_tick = 0
+    # Event ids are <run_id>-<frame_seq>-<box>; run_id keeps them unique across restarts
+    run_id = secrets.token_hex(4)
+    frame_seq = 0
     time.sleep(1)
 
     while True:
-        success, frame = cap.read()
-        
-        if frame is None:
-            time.sleep(0.1)
-            continue
-            
-        if not success:
-            time.sleep(1)
+        # Cleared before collecting so a frame landing mid-iteration wakes the next wait
+        frame_ready.clear()
+
+        # Newest frame from each live reader; a dead or reconnecting camera
+        # just drops out of the batch instead of stalling the others
+        batch_ids, frames = [], []
+        for i, (camera_id, cap) in enumerate(zip(camera_ids, caps)):
+            if not cap.alive:
+                continue
+            cap.need_frame.set()
+            seq, frame = cap.read()
+            if seq == last_seq[i]:
+                continue
+            last_seq[i] = seq
+            batch_ids.append(camera_id)
+            frames.append(frame)
+
+        if not frames:
+            frame_ready.wait(1.0)
             continue
 
-        # Heartbeat
-        if time.time() - last_heartbeat > 5:
-            r.setex(f"heartbeat:detector:{camera_id}", 60, str(time.time()))
-            last_heartbeat = time.time()
+        now = time.monotonic()
 
-        # Debug every 10 seconds
-        if time.time() - last_debug > 10:
-            print(f"[v2-Eye] Processing frame {frame.shape}")
-            last_debug = time.time()
+        # Heartbeat (payload is wall-clock time for the health checker). Sent
+        # here, at most one round-trip per 5s per camera, rather than through
+        # the writer queue, so a JPEG backlog can neither delay nor drop it
+        heartbeats = r.pipeline(transaction=False)
+        for camera_id in batch_ids:
+            if now - last_heartbeat[camera_id] > 5:
+                heartbeats.setex(f"heartbeat:detector:{camera_id}", 60, str(time.time()))
+                last_heartbeat[camera_id] = now
+        if len(heartbeats):
+            try:
+                heartbeats.execute()
+            except redis.RedisError as e:
+                log.warning(f"Heartbeat failed: {e}")
+
+        # Status summary every 10 seconds instead of a line per detection
+        if now - last_debug > 10:
+            log.info(f"Processing {len(frames)} frame(s) {frames[0].shape}, "
+                     f"{detections_since_tick} detection(s) since last tick")
+            detections_since_tick = 0
+            last_debug = now
 
         # PERSON ONLY (class 0), 70% confidence
-        results = model(frame, stream=True, verbose=False, conf=0.40, classes=[0])
+        if preprocess is not None:
+            results = model(preprocess(frames), imgsz=ENGINE_IMGSZ, half=half,
+                            verbose=False, conf=0.40, classes=[0])
+            preprocess.restore(results, frames)
+        else:
+            results = model(frames, imgsz=ENGINE_IMGSZ, half=half, verbose=False,
+                            conf=0.40, classes=[0])
+
+        timestamp = None
+        images = []
 
-        for result in results:
+        for camera_id, result in zip(batch_ids, results):
             boxes_count = len(result.boxes)
-            
             if boxes_count == 0:
                 continue
-            
-            print(f"[v2-Eye] Found {boxes_count} person(s)")
-            annotated_frame = result.plot()
-            
-            for box in result.boxes:
+
+            detections_since_tick += boxes_count
+            log.debug("%s: Found %d person(s)", camera_id, boxes_count)
+
+            if timestamp is None:
+                timestamp = datetime.utcnow().isoformat() + "Z"
+
+            # One annotated image per frame, shared by every box in it
+            frame_seq += 1
+            frame_id = f"{run_id}-{frame_seq}"
+            filename = f"{camera_id}_{frame_id}.jpg"
+            filepath = os.path.join(RAM_DISK_PATH, filename)
+
+            payloads = []
+            for i, box in enumerate(result.boxes):
                 label = model.names[int(box.cls)]
                 conf = float(box.conf)
-                
-                # Save and publish
-                event_id = str(uuid.uuid4())
-                timestamp = datetime.utcnow().isoformat() + "Z"
-                filename = f"{camera_id}_{event_id}.jpg"
-                filepath = os.path.join(RAM_DISK_PATH, filename)
-                
-                cv2.imwrite(filepath, annotated_frame)
 
                 payload = {
-                    "id": event_id,
+                    "id": f"{frame_id}-{i}",
                     "camera": camera_id,
                     "time": timestamp,
                     "file": filepath,
                     "class": label,
                     "score": conf
                 }
-                r.publish(REDIS_CHANNEL, json.dumps(payload))
-                print(f"[v2-Eye] {label} ({conf:.0%}) -> Published to Redis")
+                payloads.append(payload)
+                log.debug("%s (%.0f%%) -> queued for Redis", label, conf * 100)
+
+            images.append((filepath, result.plot(), payloads))
+
+        if images:
+            try:
+                writer_q.put_nowait(images)
+            except queue.Full:
+                log.warning("Writer backlog full, dropping batch")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--camid", required=True)
-    parser.add_argument("--source", required=True)
+    parser.add_argument("--camid", required=True, help="Camera id, or comma-separated list")
+    parser.add_argument("--source", required=True, help="RTSP url, or comma-separated list")
+    parser.add_argument("--model", default="yolo11n.pt")
+    parser.add_argument("--int8", action="store_true", help="Export INT8 engine instead of FP16")
+    parser.add_argument("--calib", default=None, help="Dataset yaml with INT8 calibration frames")
+    parser.add_argument("--hwdecode", action="store_true", help="Decode RTSP on NVDEC via ffmpeg")
+    parser.add_argument("--compile", action="store_true",
+                        help="torch.compile the model when no TensorRT engine is available")
     args = parser.parse_args()
     
+    camera_ids = args.camid.split(",")
+    rtsp_urls = args.source.split(",")
+    if len(camera_ids) != len(rtsp_urls):
+        parser.error("--camid and --source must list the same number of cameras")
+    if args.int8 and not args.calib:
+        parser.error("--int8 needs --calib")
+
     os.makedirs(RAM_DISK_PATH, exist_ok=True)
-    run_worker(args.camid, args.source)
+    run_worker(camera_ids, rtsp_urls, model_name=args.model,
+               int8=args.int8, calib_data=args.calib, hwdecode=args.hwdecode,
+               compile=args.compile)
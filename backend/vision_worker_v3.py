@@ -6,10 +6,35 @@ import argparse
 import os
 import uuid
 import threading
+from concurrent.futures import ThreadPoolExecutor
 import boto3
+from botocore.config import Config
 from ultralytics import YOLO
 from datetime import datetime
 
+# orjson when installed, for detection payloads
+try:
+    import orjson
+    dumps = orjson.dumps
+except ImportError:
+    dumps = json.dumps
+
+# libjpeg-turbo SIMD encoder; falls back to cv2.imencode if unavailable
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420
+    _TJ = TurboJPEG()
+except Exception:
+    _TJ = None
+
+# GPU annotation: boxes drawn with tensor ops and nvJPEG-encoded on the GPU,
+# so only the compressed JPEG is copied back (torchvision >= 0.19)
+try:
+    import torch
+    from torchvision.io import encode_jpeg as nvjpeg_encode
+    GPU_ANNOTATE = torch.cuda.is_available()
+except ImportError:
+    GPU_ANNOTATE = False
+
 # Force TCP for RTSP
 os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp"
 
@@ -19,15 +44,27 @@ S3_ACCESS_KEY = 'minioadmin'
 S3_SECRET_KEY = 'minioadmin'
 BUCKET_NAME = 'images'
 PUBLIC_IP = '136.119.129.106'  # Your Public IP
+JPEG_QUALITY = 85
+BOX_COLOR_RGB = (255, 56, 56)  # Ultralytics' person (class 0) color
+
+# Encode + upload + publish run off the inference loop; the S3 client keeps
+# one pooled keep-alive connection per worker
+IO_WORKERS = 8
+IO_MAX_PENDING = 16
+
+# Frames per YOLO call when one worker serves several cameras
+MAX_BATCH = int(os.environ.get("V3_MAX_BATCH", "4"))
 
 REDIS_CHANNEL = "live_events"
 
 class FreshFrame:
-    def __init__(self, url):
+    def __init__(self, url, frame_ready=None):
         self.cap = cv2.VideoCapture(url)
-        self.lock = threading.Lock()
-        self.frame = None
-        self.success = False
+        # (seq, frame) swapped as one reference, so readers never see a torn
+        # pair; seq tells the main loop whether the frame is new
+        self._latest = (0, None)
+        # Set on every new frame; may be shared by several cameras
+        self.frame_ready = frame_ready or threading.Event()
         self.running = True
         
         if not self.cap.isOpened():
@@ -40,37 +77,139 @@ class FreshFrame:
         print(f"[v3-Eye] FreshFrame thread started")
 
     def _reader(self):
+        seq = 0
         while self.running:
             success, frame = self.cap.read()
             if not success:
+                # Dropped stream: back off before retrying the capture
                 time.sleep(1)
                 continue
-            with self.lock:
-                self.frame = frame
-                self.success = success
+            seq += 1
+            self._latest = (seq, frame)
+            self.frame_ready.set()
 
     def read(self):
-        with self.lock:
-            return self.success, self.frame
+        """Return (seq, frame); seq is 0 until the first frame arrives."""
+        return self._latest
             
     def release(self):
         self.running = False
         self.cap.release()
 
 
-def run_worker(camera_id, rtsp_url, model_name="yolo11n.pt", redis_host="localhost"):
-    print(f"[v3-Eye] Starting Vision Worker for {camera_id}")
+def encode_jpeg(frame):
+    """Encode a BGR frame to JPEG bytes, or None on failure."""
+    if _TJ is not None:
+        return _TJ.encode(frame, quality=JPEG_QUALITY, pixel_format=TJPF_BGR,
+                          jpeg_subsample=TJSAMP_420)
+    success, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    return buffer.tobytes() if success else None
+
+
+def annotate_jpeg_gpu(frame, boxes_xyxy):
+    """Draw box outlines on a GPU copy of the BGR frame and encode it with
+    nvJPEG. Returns JPEG bytes. Unlike result.plot(), no class/score labels
+    are drawn (text rendering has no tensor-op equivalent); both are in the
+    event payload."""
+    img = torch.from_numpy(frame).to("cuda", non_blocking=True)
+    img = img.flip(-1).permute(2, 0, 1).contiguous()  # HWC BGR -> CHW RGB
+    _, h, w = img.shape
+    t = max(round((h + w) / 2 * 0.003), 2)  # result.plot()'s default line width
+    color = torch.tensor(BOX_COLOR_RGB, dtype=torch.uint8, device=img.device).view(3, 1, 1)
+
+    for x1, y1, x2, y2 in boxes_xyxy.round().int().tolist():
+        x1, y1 = max(x1, 0), max(y1, 0)
+        x2, y2 = min(x2, w - 1), min(y2, h - 1)
+        img[:, y1:y1 + t, x1:x2 + 1] = color
+        img[:, max(y2 - t + 1, 0):y2 + 1, x1:x2 + 1] = color
+        img[:, y1:y2 + 1, x1:x1 + t] = color
+        img[:, y1:y2 + 1, max(x2 - t + 1, 0):x2 + 1] = color
+
+    return nvjpeg_encode(img, quality=JPEG_QUALITY).cpu().numpy().tobytes()
+
+
+def render_snapshot(frame, result):
+    """Annotated JPEG bytes for a detection frame, or None on failure.
+
+    Uses annotate_jpeg_gpu() while nvJPEG works (boxes only), else
+    result.plot() with its usual labels. Any GPU failure switches every
+    later snapshot to the CPU path."""
+    global GPU_ANNOTATE
+    if GPU_ANNOTATE:
+        try:
+            return annotate_jpeg_gpu(frame, result.boxes.xyxy)
+        except Exception as e:
+            # e.g. torchvision built without CUDA JPEG encode
+            print(f"[v3-Eye] GPU annotation unavailable, using result.plot(): {e}")
+            GPU_ANNOTATE = False
+    return encode_jpeg(result.plot())
+
+
+def upload_and_publish(s3, r, camera_id, frame, result, detections, timestamp):
+    """Annotate + encode the frame once, upload it to S3/MinIO and publish one
+    event per detection. Runs on the I/O pool so inference never waits on it
+    (the nvJPEG result's copy back to the CPU included)."""
+    event_ids = [str(uuid.uuid4()) for _ in detections]
+    filename = f"{camera_id}_{event_ids[0]}.jpg"
+
+    # Everything runs on the pool, where a raised exception would only land
+    # in an unread future, so encode failures are caught and logged here too
+    try:
+        # Encode image to JPEG bytes
+        jpeg_bytes = render_snapshot(frame, result)
+        if jpeg_bytes is None:
+            print(f"[v3-Eye] Failed to encode image")
+            return
+
+        # Upload to S3/MinIO
+        s3.put_object(
+            Bucket=BUCKET_NAME,
+            Key=filename,
+            Body=jpeg_bytes,
+            ContentType='image/jpeg'
+        )
+
+        # Construct Public URL
+        image_url = f"http://{PUBLIC_IP}:9000/{BUCKET_NAME}/{filename}"
+
+        for event_id, (label, conf, bbox_xyxy) in zip(event_ids, detections):
+            # v1 format payload - required by Node.js server
+            payload = {
+                "type": "detection",       # Required by Node
+                "camera_id": camera_id,      # Required (was "camera")
+                "timestamp": timestamp,      # Required (was "time")
+                "label": label,              # Required (was "class")
+                "confidence": conf,          # Required (was "score")
+                "frame_image": None,         # Legacy field
+                "snapshot_path": image_url,  # The S3 URL
+                "image_path": image_url,     # Redundancy for compat
+                "imageUrl": image_url,       # For UI compat
+                "bbox": bbox_xyxy,           # Bounding box
+                "mode": "LIVE",            # Required
+                "id": event_id               # Keep the ID
+            }
+            r.publish(REDIS_CHANNEL, dumps(payload))
+            print(f"[v3-Eye] {label} ({conf:.0%}) -> S3 + Redis")
+
+    except Exception as e:
+        print(f"[v3-Eye] Snapshot encode/upload failed: {e}")
+
+
+def run_worker(camera_ids, rtsp_urls, model_name="yolo11n.pt", redis_host="localhost"):
+    print(f"[v3-Eye] Starting Vision Worker for {', '.join(camera_ids)}")
     print(f"[v3-Eye] Mode: PERSON ONLY, 50% confidence")
     print(f"[v3-Eye] Storage: S3/MinIO @ {S3_ENDPOINT}")
     
     # Redis for pub/sub
-    r = redis.Redis(host=redis_host, port=6379, decode_responses=True)
+    r = redis.Redis(host=redis_host, port=6379)
     
     # Initialize S3 Client (boto3)
     s3 = boto3.client('s3',
                       endpoint_url=S3_ENDPOINT,
                       aws_access_key_id=S3_ACCESS_KEY,
-                      aws_secret_access_key=S3_SECRET_KEY)
+                      aws_secret_access_key=S3_SECRET_KEY,
+                      config=Config(max_pool_connections=IO_WORKERS,
+                                    tcp_keepalive=True))
     
     # Verify bucket exists
     try:
@@ -80,103 +219,94 @@ def run_worker(camera_id, rtsp_url, model_name="yolo11n.pt", redis_host="localho
         print(f"[v3-Eye] ERROR: Bucket '{BUCKET_NAME}' does not exist: {e}")
         return
     
+    io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS)
+    io_slots = threading.BoundedSemaphore(IO_MAX_PENDING)
+
     model = YOLO(model_name)
+    if GPU_ANNOTATE:
+        print(f"[v3-Eye] Annotating + JPEG encoding on GPU (nvJPEG)")
     
-    cap = FreshFrame(rtsp_url)
-    print(f"[v3-Eye] Connected to {rtsp_url}")
-    last_heartbeat = 0
+    frame_ready = threading.Event()
+    caps = {}
+    for camera_id, rtsp_url in zip(camera_ids, rtsp_urls):
+        caps[camera_id] = FreshFrame(rtsp_url, frame_ready)
+        print(f"[v3-Eye] Connected to {rtsp_url}")
+    last_seq = {camera_id: 0 for camera_id in caps}
+    # Per camera: a slow camera that misses one pass still gets its own 5s window
+    last_heartbeat = {camera_id: 0 for camera_id in caps}
     last_debug = 0
     time.sleep(1)
 
     while True:
-        success, frame = cap.read()
-        
-        if frame is None:
-            time.sleep(0.1)
-            continue
-            
-        if not success:
-            time.sleep(1)
+        # Cleared before reading so a frame landing mid-iteration wakes the next wait
+        frame_ready.clear()
+
+        # Latest frame from every camera that has a new one; a frozen camera
+        # is skipped rather than re-inferred and re-published
+        ready = []
+        for camera_id, cap in caps.items():
+            seq, frame = cap.read()
+            if seq != last_seq[camera_id]:
+                last_seq[camera_id] = seq
+                ready.append((camera_id, frame))
+
+        if not ready:
+            # Block until any camera delivers a new frame instead of polling
+            frame_ready.wait(1.0)
             continue
 
         # Heartbeat
-        if time.time() - last_heartbeat > 5:
-            r.setex(f"heartbeat:detector:{camera_id}", 60, str(time.time()))
-            last_heartbeat = time.time()
+        now = time.time()
+        for camera_id, _ in ready:
+            if now - last_heartbeat[camera_id] > 5:
+                r.setex(f"heartbeat:detector:{camera_id}", 60, b"%f" % now)
+                last_heartbeat[camera_id] = now
 
         # Debug every 10 seconds
         if time.time() - last_debug > 10:
-            print(f"[v3-Eye] Processing frame {frame.shape}")
+            print(f"[v3-Eye] Processing {len(ready)} frame(s) {ready[0][1].shape}")
             last_debug = time.time()
 
-        # PERSON ONLY (class 0), 50% confidence
-        results = model(frame, stream=True, verbose=False, conf=0.30, classes=[0])
+        # One forward pass per MAX_BATCH cameras instead of one per frame
+        for start in range(0, len(ready), MAX_BATCH):
+            batch = ready[start:start + MAX_BATCH]
 
-        for result in results:
-            boxes_count = len(result.boxes)
-            
-            if boxes_count == 0:
-                continue
+            # PERSON ONLY (class 0), 50% confidence
+            results = model([frame for _, frame in batch], verbose=False, conf=0.30, classes=[0])
+
+            for (camera_id, frame), result in zip(batch, results):
+                boxes_count = len(result.boxes)
             
-            print(f"[v3-Eye] Found {boxes_count} person(s)")
-            annotated_frame = result.plot()
+                if boxes_count == 0:
+                    continue
             
-            for box in result.boxes:
-                label = model.names[int(box.cls)]
-                conf = float(box.conf)
-                
-                # Generate unique filename
-                event_id = str(uuid.uuid4())
+                print(f"[v3-Eye] Found {boxes_count} person(s)")
+
                 timestamp = datetime.utcnow().isoformat() + "Z"
-                filename = f"{camera_id}_{event_id}.jpg"
-                
-                # Encode image to JPEG bytes
-                success_enc, buffer = cv2.imencode('.jpg', annotated_frame)
-                if not success_enc:
-                    print(f"[v3-Eye] Failed to encode image")
-                    continue
-                
-                # Upload to S3/MinIO
-                try:
-                    s3.put_object(
-                        Bucket=BUCKET_NAME,
-                        Key=filename,
-                        Body=buffer.tobytes(),
-                        ContentType='image/jpeg'
-                    )
-                    
-                    # Construct Public URL
-                    image_url = f"http://{PUBLIC_IP}:9000/{BUCKET_NAME}/{filename}"
-                    
-                    # Get bounding box coordinates
-                    bbox_xyxy = box.xyxy[0].tolist() if hasattr(box, 'xyxy') else [0, 0, 0, 0]
-                    
-                    # v1 format payload - required by Node.js server
-                    payload = {
-                        "type": "detection",       # Required by Node
-                        "camera_id": camera_id,      # Required (was "camera")
-                        "timestamp": timestamp,      # Required (was "time")
-                        "label": label,              # Required (was "class")
-                        "confidence": conf,          # Required (was "score")
-                        "frame_image": None,         # Legacy field
-                        "snapshot_path": image_url,  # The S3 URL
-                        "image_path": image_url,     # Redundancy for compat
-                        "imageUrl": image_url,       # For UI compat
-                        "bbox": bbox_xyxy,           # Bounding box
-                        "mode": "LIVE",            # Required
-                        "id": event_id               # Keep the ID
-                    }
-                    r.publish(REDIS_CHANNEL, json.dumps(payload))
-                    print(f"[v3-Eye] {label} ({conf:.0%}) -> S3 + Redis")
-                    
-                except Exception as e:
-                    print(f"[v3-Eye] S3 upload failed: {e}")
+                detections = [
+                    (model.names[int(box.cls)], float(box.conf), box.xyxy[0].tolist())
+                    for box in result.boxes
+                ]
+
+                # Annotate/encode/upload/publish on the I/O pool; blocks only
+                # when IO_MAX_PENDING frames are already in flight (backpressure)
+                io_slots.acquire()
+                future = io_pool.submit(upload_and_publish, s3, r, camera_id,
+                                        frame, result, detections, timestamp)
+                future.add_done_callback(lambda _: io_slots.release())
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--camid", required=True)
-    parser.add_argument("--source", required=True)
+    parser.add_argument("--camid", required=True,
+                        help="Camera id, or comma-separated ids for multi-camera batching")
+    parser.add_argument("--source", required=True,
+                        help="RTSP URL, or comma-separated URLs matching --camid")
     args = parser.parse_args()
-    
-    run_worker(args.camid, args.source)
+
+    camera_ids = args.camid.split(",")
+    rtsp_urls = args.source.split(",")
+    if len(camera_ids) != len(rtsp_urls):
+        parser.error("--camid and --source must list the same number of cameras")
+
+    run_worker(camera_ids, rtsp_urls)
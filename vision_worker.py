@@ -4,79 +4,522 @@ import json
 import redis
 import argparse
 import os
-import uuid
+import re
+import threading
+import queue
+import torch
+import torch.nn.functional as F
 from ultralytics import YOLO
+from ultralytics.utils import ops
 from datetime import datetime
 
+# orjson when installed; the output thread serializes every payload
+try:
+    import orjson
+    dumps = orjson.dumps
+except ImportError:
+    dumps = json.dumps
+
+# nvJPEG encode of CUDA tensors (torchvision >= 0.19)
+try:
+    from torchvision.io import encode_jpeg as nvjpeg_encode
+    NVJPEG_AVAILABLE = torch.cuda.is_available()
+except ImportError:
+    NVJPEG_AVAILABLE = False
+
 # --- CONFIGURATION ---
 RAM_DISK_PATH = "/dev/shm/securewatch_v2"
 REDIS_CHANNEL = "v2:detections"  # New channel so old system ignores it
+DETECT_CLASSES = (0, 2)  # 0=person, 2=car
 
-def run_worker(camera_id, rtsp_url, model_name="yolo11n.pt", redis_host="localhost"):
-    # 1. Setup Infrastructure
-    print(f"[v2-Eye] Starting Vision Worker for {camera_id}")
-    r = redis.Redis(host=redis_host, port=6379, decode_responses=True)
+# TensorRT engines only run on the GPU model + TensorRT/CUDA/cuDNN versions
+# that built them, so the cache file name carries the GPU and input size.
+# Rebuild (delete the .engine) after upgrading tensorrt, CUDA or the driver.
+ENGINE_IMGSZ = 640
+
+JPEG_QUALITY = 85
+
+# Batches waiting for JPEG save + publish; batches are dropped rather than
+# stalling inference
+OUTPUT_QUEUE_SIZE = 8
+
+# Motion gate (--motion-threshold): frames are compared as 64x64 grayscale
+# thumbnails against the camera's last inferred frame
+MOTION_THUMB_SIZE = (64, 64)
+
+# Most frames per forward pass; more cameras are split into several batches
+MAX_BATCH = 16
+
+# Hardware decode (--hwaccel): "any" lets OpenCV's FFmpeg backend pick NVDEC/
+# VAAPI/etc. and silently falls back to CPU decode; "jetson" decodes on
+# nvv4l2decoder through GStreamer (OpenCV must be built with GStreamer)
+HWACCEL_MODES = {
+    "none": cv2.VIDEO_ACCELERATION_NONE,
+    "any": cv2.VIDEO_ACCELERATION_ANY,
+    "vaapi": cv2.VIDEO_ACCELERATION_VAAPI,
+    "jetson": None,
+}
+JETSON_PIPELINE = (
+    "rtspsrc location={url} protocols=tcp latency=0 ! rtph264depay ! h264parse ! "
+    "nvv4l2decoder ! nvvidconv ! video/x-raw,format=BGRx ! videoconvert ! "
+    "video/x-raw,format=BGR ! appsink drop=1 max-buffers=1"
+)
+
+# Reconnect delay after a lost stream: doubles per failed attempt, resets on success
+RECONNECT_MIN = 0.5
+RECONNECT_MAX = 30
+
+def open_capture(url, hwaccel="any", cap=None):
+    """Open an RTSP stream, decoding on the GPU/VPU where available.
+    Pass an existing (released) cap to reopen it in place."""
+    if cap is None:
+        cap = cv2.VideoCapture()
+    if hwaccel == "jetson":
+        cap.open(JETSON_PIPELINE.format(url=url), cv2.CAP_GSTREAMER)
+    else:
+        cap.open(url, cv2.CAP_FFMPEG, [cv2.CAP_PROP_HW_ACCELERATION, HWACCEL_MODES[hwaccel]])
+    return cap
+
+def prune_classes(yolo, keep):
+    """Cut the detection head down to the `keep` class ids, in place.
+
+    Slices the last 1x1 conv of every class branch so the head, the sigmoid and
+    NMS work on len(keep) logits instead of 80. Class ids become 0..len(keep)-1;
+    model.names is remapped to match."""
+    head = yolo.model.model[-1]
+    idx = torch.tensor(keep)
+    branches = [head.cv3] + ([head.one2one_cv3] if hasattr(head, "one2one_cv3") else [])
+    for branch in branches:
+        for level in branch:
+            conv = level[-1]
+            conv.weight = torch.nn.Parameter(conv.weight.data[idx].clone())
+            conv.bias = torch.nn.Parameter(conv.bias.data[idx].clone())
+            conv.out_channels = len(keep)
+    head.nc = len(keep)
+    head.no = head.nc + head.reg_max * 4
+    names = yolo.model.names
+    yolo.model.names = {i: names[cls] for i, cls in enumerate(keep)}
+    yolo.model.yaml["nc"] = len(keep)
+    return yolo
+
+def load_weights(model_name, prune=False):
+    """PyTorch YOLO, optionally pruned to DETECT_CLASSES."""
     model = YOLO(model_name)
+    return prune_classes(model, DETECT_CLASSES) if prune else model
+
+def load_model(model_name, imgsz=ENGINE_IMGSZ, batch=1, int8=False, calib_data=None,
+               prune=False):
+    """Load YOLO as an FP16 TensorRT engine, exporting it once and caching it
+    on disk. Falls back to the PyTorch weights without a GPU or TensorRT.
+
+    With batch > 1 the engine takes dynamic batches of up to `batch` frames.
+    With int8 the engine is INT8-calibrated on `calib_data`, a dataset yaml
+    pointing at a few hundred representative camera frames.
+    With prune the head only predicts DETECT_CLASSES (see prune_classes)."""
+    if not torch.cuda.is_available():
+        print("[v2-Eye] No CUDA device, using PyTorch weights")
+        return load_weights(model_name, prune)
+
+    gpu = re.sub(r"[^A-Za-z0-9]+", "-", torch.cuda.get_device_name(0)).strip("-").lower()
+    stem = f"{os.path.splitext(model_name)[0]}-{imgsz}-{gpu}"
+    if batch > 1:
+        stem = f"{stem}-b{batch}"
+    if prune:
+        stem = f"{stem}-c{'_'.join(map(str, DETECT_CLASSES))}"
+    engine_path = f"{stem}-int8.engine" if int8 else f"{stem}.engine"
+
+    if not os.path.exists(engine_path):
+        print(f"[v2-Eye] Exporting {model_name} -> {engine_path} (one-time)")
+        try:
+            export_args = dict(format="engine", half=not int8, imgsz=imgsz, device=0,
+                               dynamic=batch > 1, batch=batch)
+            if int8:
+                # Ultralytics runs TensorRT's entropy calibrator over calib_data
+                export_args.update(int8=True, data=calib_data)
+            try:
+                # NMS baked into the engine (EfficientNMS), so it returns final
+                # top-k boxes and Python skips its own NMS pass
+                exported = load_weights(model_name, prune).export(nms=True, **export_args)
+            except Exception as e:
+                # Ultralytics releases without engine nms= support
+                print(f"[v2-Eye] Engine export with NMS failed, exporting without: {e}")
+                exported = load_weights(model_name, prune).export(**export_args)
+            os.replace(exported, engine_path)
+        except Exception as e:
+            print(f"[v2-Eye] TensorRT export failed, using PyTorch weights: {e}")
+            return load_weights(model_name, prune)
+
+    print(f"[v2-Eye] Using TensorRT engine {engine_path}")
+    return YOLO(engine_path, task="detect")
+
+def save_jpeg_gpu(filepath, frame, stream=None):
+    """JPEG-encode a BGR frame with nvJPEG and write it to filepath; the CPU
+    only touches the compressed bytes. Work is queued on `stream` if given."""
+    with torch.cuda.stream(stream):
+        img = torch.from_numpy(frame).to("cuda", non_blocking=True).flip(-1).permute(2, 0, 1)
+        data = nvjpeg_encode(img.contiguous(), quality=JPEG_QUALITY).cpu().numpy()
+    write_file(filepath, data)
+
+def save_jpeg_cpu(filepath, frame):
+    """JPEG-encode a BGR frame with OpenCV and write it to filepath."""
+    ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    if not ok:
+        print(f"[v2-Eye] Failed to encode {filepath}")
+        return
+    write_file(filepath, buf)
+
+def write_file(path, data):
+    """Write a bytes-like buffer straight to an fd, skipping buffered file IO."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+def start_output_thread(r, class_names):
+    """Save + publish detections on a daemon thread so the next batch's
+    inference overlaps this batch's JPEG encode and Redis round-trip.
+
+    Queue items are (timestamp, [(camera_id, frame, cls_ids, scores), ...]).
+    nvJPEG work runs on its own CUDA stream, so it doesn't serialize behind
+    inference kernels on the default stream."""
+    output_q = queue.Queue(maxsize=OUTPUT_QUEUE_SIZE)
+    encode_stream = torch.cuda.Stream() if NVJPEG_AVAILABLE else None
+
+    def _output():
+        use_nvjpeg = NVJPEG_AVAILABLE
+        # Local binding (LOAD_FAST) for a name used per box
+        channel = REDIS_CHANNEL
+
+        while True:
+            timestamp, detected = output_q.get()
+
+            # Every publish from this batch goes out in one round-trip; the
+            # images are already written by the time execute() sends them
+            pipe = r.pipeline(transaction=False)
+
+            for camera_id, frame, cls_ids, scores in detected:
+                # 4. The "Action" (Save to RAM & Signal)
+
+                # One image per frame, shared by every box in it; named after
+                # the frame's first event
+                # 64 random bits is plenty for ids that live as long as a ramdisk file
+                event_ids = [os.urandom(8).hex() for _ in range(len(cls_ids))]
+                filepath = f"{RAM_DISK_PATH}/{camera_id}_{event_ids[0]}.jpg"
+
+                # Save Image to RAM (Instant)
+                if use_nvjpeg:
+                    try:
+                        save_jpeg_gpu(filepath, frame, encode_stream)
+                    except RuntimeError as e:
+                        # e.g. torchvision built without CUDA JPEG encode
+                        print(f"[v2-Eye] nvJPEG unavailable, using cv2.imencode: {e}")
+                        use_nvjpeg = False
+                if not use_nvjpeg:
+                    save_jpeg_cpu(filepath, frame)
+
+                for event_id, cls_id, score in zip(event_ids, cls_ids, scores):
+                    # Construct Signal
+                    payload = {
+                        "id": event_id,
+                        "camera": camera_id,
+                        "time": timestamp,
+                        "file": filepath, # Pointer to RAM
+                        "class": class_names[cls_id],
+                        "score": score
+                    }
+
+                    # Fire Signal
+                    pipe.publish(channel, dumps(payload))
+                    print(f" -> [v2-Eye] Saw {payload['class']} ({payload['score']:.2f}) -> Saved to RAM")
+
+            try:
+                pipe.execute()
+            except redis.RedisError as e:
+                print(f"[v2-Eye] Redis publish failed: {e}")
+
+    threading.Thread(target=_output, daemon=True).start()
+    return output_q
+
+class FreshFrame:
+    """Reader thread that keeps only the newest decoded frame (older ones are
+    overwritten, never queued), so a slow inference loop can't drift behind."""
+
+    def __init__(self, camera_id, url, hwaccel, frame_ready):
+        self.camera_id = camera_id
+        self.url = url
+        self.hwaccel = hwaccel
+        self.cap = open_capture(url, hwaccel)
+        # (seq, frame) swapped as one reference; seq tells the loop a frame is new
+        self.latest = (0, None)
+        self.frame_ready = frame_ready
+        self.thread = threading.Thread(target=self._reader, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _reader(self):
+        seq = 0
+        backoff = RECONNECT_MIN
+        while True:
+            if not self.cap.grab():
+                print(f"[v2-Eye] Stream lost for {self.camera_id}. Reconnecting in {backoff:g}s...")
+                # Free the FFmpeg context before reopening on the same VideoCapture
+                self.cap.release()
+                time.sleep(backoff)
+                backoff = min(backoff * 2, RECONNECT_MAX)
+                open_capture(self.url, self.hwaccel, self.cap)
+                continue
+            backoff = RECONNECT_MIN
+            success, frame = self.cap.retrieve()
+            if not success:
+                continue
+            seq += 1
+            self.latest = (seq, frame)
+            self.frame_ready.set()
+
+class PinnedInput:
+    """GPU letterbox for one batch of up to MAX_BATCH camera frames."""
+
+    def __init__(self, imgsz=ENGINE_IMGSZ, batch=1, half=False):
+        self.imgsz = imgsz
+        dtype = torch.float16 if half else torch.float32
+        self.gpu = torch.empty((batch, 3, imgsz, imgsz), dtype=dtype, device="cuda")
+        self.staging = {}
+        # RTSP resolutions are fixed, so this is computed once per camera
+        self.geometry = {}
+
+    def _stage(self, i, frame):
+        buf = self.staging.get(i)
+        if buf is None or buf.shape != frame.shape:
+            buf = torch.empty(frame.shape, dtype=torch.uint8).pin_memory()
+            self.staging[i] = buf
+        buf.copy_(torch.from_numpy(frame))
+        return buf.to("cuda", non_blocking=True)
+
+    def _letterbox(self, h, w):
+        geometry = self.geometry.get((h, w))
+        if geometry is None:
+            scale = min(self.imgsz / h, self.imgsz / w)
+            nh, nw = round(h * scale), round(w * scale)
+            top, left = (self.imgsz - nh) // 2, (self.imgsz - nw) // 2
+            geometry = self.geometry[(h, w)] = (nh, nw, top, left)
+        return geometry
+
+    def __call__(self, frames):
+        n = len(frames)
+        gpu = self.gpu[:n]
+        gpu.fill_(114)
+
+        for i, frame in enumerate(frames):
+            nh, nw, top, left = self._letterbox(*frame.shape[:2])
+
+            x = self._stage(i, frame).permute(2, 0, 1).flip(0).unsqueeze(0).to(gpu.dtype)
+            x = F.interpolate(x, size=(nh, nw), mode="bilinear", align_corners=False)
+            gpu[i, :, top:top + nh, left:left + nw] = x[0]
+
+        return gpu.div_(255)
+
+    def restore(self, results, frames):
+        for result, frame in zip(results, frames):
+            result.orig_img = frame
+            result.orig_shape = frame.shape[:2]
+            boxes = result.boxes.data.clone()
+            boxes[:, :4] = ops.scale_boxes((self.imgsz, self.imgsz), boxes[:, :4], frame.shape)
+            result.update(boxes=boxes)
+        return results
+
+class GraphedDetector:
+    """Replay the PyTorch model's forward as one captured CUDA graph instead of
+    hundreds of kernel launches. The input shape is fixed at capture time:
+    smaller batches are run padded to `batch` and the extra outputs ignored."""
+
+    def __init__(self, net, batch, imgsz=ENGINE_IMGSZ, half=False):
+        dtype = torch.float16 if half else torch.float32
+        self.static_in = torch.zeros((batch, 3, imgsz, imgsz), dtype=dtype, device="cuda")
+
+        with torch.no_grad():
+            # Warm up on a side stream (cuDNN autotune, lazy allocations)
+            # before capture, as CUDA graphs require
+            side = torch.cuda.Stream()
+            side.wait_stream(torch.cuda.current_stream())
+            with torch.cuda.stream(side):
+                for _ in range(3):
+                    net(self.static_in)
+            torch.cuda.current_stream().wait_stream(side)
+
+            self.graph = torch.cuda.CUDAGraph()
+            with torch.cuda.graph(self.graph):
+                out = net(self.static_in)
+        # Detect returns (predictions, raw feature maps) in eval mode
+        self.static_out = out[0] if isinstance(out, (tuple, list)) else out
+
+    def __call__(self, x):
+        n = x.shape[0]
+        self.static_in[:n].copy_(x)
+        self.graph.replay()
+        return self.static_out[:n]
+
+def motion_thumb(frame):
+    """Small grayscale copy of a frame for the motion gate."""
+    return cv2.cvtColor(cv2.resize(frame, MOTION_THUMB_SIZE, interpolation=cv2.INTER_AREA),
+                        cv2.COLOR_BGR2GRAY)
+
+def run_worker(camera_ids, rtsp_urls, model_name="yolo11n.pt", redis_host="localhost",
+               hwaccel="any", motion_threshold=0.0, int8=False, calib_data=None,
+               redis_socket=None, prune=False, cuda_graph=False):
+    # 1. Setup Infrastructure
+    print(f"[v2-Eye] Starting Vision Worker for {', '.join(camera_ids)}")
+    # --redis-socket (redis.conf: unixsocket) skips the TCP loopback stack
+    if redis_socket:
+        r = redis.Redis(unix_socket_path=redis_socket)
+    else:
+        r = redis.Redis(host=redis_host, port=6379, socket_keepalive=True)
+    batch = min(len(camera_ids), MAX_BATCH)
+    model = load_model(model_name, batch=batch, int8=int8, calib_data=calib_data, prune=prune)
+    # FP16 on GPU; INT8 engines keep an FP32 input binding
+    half = torch.cuda.is_available() and not int8
+    preprocess = PinnedInput(batch=batch, half=half) if torch.cuda.is_available() else None
+    # Resolved once; the hot loop indexes this instead of model.names
+    if prune:
+        # The pruned head only predicts DETECT_CLASSES, renumbered from 0
+        class_names = dict(model.names)
+        classes = None
+    else:
+        class_names = {cls: model.names[cls] for cls in DETECT_CLASSES}
+        classes = list(DETECT_CLASSES)
+    output_q = start_output_thread(r, class_names)
+
+    # CUDA graph replay for the PyTorch fallback; a TensorRT engine is already
+    # a single enqueue per batch
+    graphed = None
+    if cuda_graph and preprocess is not None:
+        if isinstance(model.model, torch.nn.Module):
+            net = model.model.fuse().eval().to("cuda")
+            graphed = GraphedDetector(net.half() if half else net.float(), batch, half=half)
+            print(f"[v2-Eye] Captured model forward as a CUDA graph (batch {batch})")
+        else:
+            print("[v2-Eye] --cuda-graph ignored: running a TensorRT engine")
 
     # 2. Connect to MediaMTX (TCP forced for stability)
     os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp"
-    cap = cv2.VideoCapture(rtsp_url)
+    # One reader thread per camera decodes concurrently (cv2 releases the GIL)
+    frame_ready = threading.Event()
+    readers = [FreshFrame(camera_id, url, hwaccel, frame_ready)
+               for camera_id, url in zip(camera_ids, rtsp_urls)]
 
-    if not cap.isOpened():
-        print(f"[v2-Eye] Error: Could not open stream {rtsp_url}")
-        return
+    for reader in readers:
+        if not reader.cap.isOpened():
+            print(f"[v2-Eye] Error: Could not open stream {reader.url}")
+            return
+        hw = reader.cap.get(cv2.CAP_PROP_HW_ACCELERATION) > 0 or hwaccel == "jetson"
+        print(f"[v2-Eye] Connected to {reader.url} ({'hardware' if hw else 'software'} decode)")
+        reader.start()
 
-    print(f"[v2-Eye] Connected to {rtsp_url}")
+    last_seq = [0] * len(readers)
+    # Thumbnail of each camera's last inferred frame (motion gate)
+    last_thumb = [None] * len(readers)
 
     while True:
-        success, frame = cap.read()
-        if not success:
-            print("[v2-Eye] Stream lost. Reconnecting in 2s...")
-            time.sleep(2)
-            cap.open(rtsp_url)
+        # Cleared before collecting so a frame landing mid-iteration wakes the next wait
+        frame_ready.clear()
+
+        # Newest frame from each camera; skip cameras with nothing new since last pass
+        batch_ids, frames = [], []
+        for i, reader in enumerate(readers):
+            seq, frame = reader.latest
+            if seq == last_seq[i]:
+                continue
+            last_seq[i] = seq
+
+            if motion_threshold > 0:
+                # Skip near-duplicate frames: mean abs pixel diff vs the last
+                # inferred frame costs ~0.1ms, a forward pass tens of ms
+                thumb = motion_thumb(frame)
+                prev = last_thumb[i]
+                if prev is not None and cv2.mean(cv2.absdiff(thumb, prev))[0] < motion_threshold:
+                    continue
+                last_thumb[i] = thumb
+
+            batch_ids.append(reader.camera_id)
+            frames.append(frame)
+
+        if not frames:
+            frame_ready.wait(1.0)
             continue
 
-        # 3. The "Brain" (YOLO)
-        # stream=True is faster, conf=0.25 matches your Nano needs
-        results = model(frame, stream=True, verbose=False, conf=0.25, classes=[0, 2]) # 0=person, 2=car
+        # 3. The "Brain" (YOLO), one forward pass per MAX_BATCH cameras
+        # conf=0.25 matches your Nano needs
+        for start in range(0, len(frames), MAX_BATCH):
+            chunk = frames[start:start + MAX_BATCH]
+            # (class ids, scores) per frame; one device->host copy per frame
+            # instead of two per box
+            if graphed is not None:
+                preds = ops.non_max_suppression(graphed(preprocess(chunk)), conf_thres=0.25,
+                                                classes=classes)
+                boxes = [(det[:, 5].int().tolist(), det[:, 4].tolist()) for det in preds]
+            else:
+                if preprocess is not None:
+                    results = model(preprocess(chunk), verbose=False, conf=0.25,
+                                    classes=classes, imgsz=ENGINE_IMGSZ, half=half)
+                    preprocess.restore(results, chunk)
+                else:
+                    results = model(chunk, verbose=False, conf=0.25,
+                                    classes=classes, imgsz=ENGINE_IMGSZ, half=half)
+                boxes = [(result.boxes.cls.int().tolist(), result.boxes.conf.tolist())
+                         for result in results]
 
-        for result in results:
-            for box in result.boxes:
-                # 4. The "Action" (Save to RAM & Signal)
+            # Every detection in a batch shares one timestamp
+            timestamp = None
+            detected = []
 
-                # Generate unique ID
-                event_id = str(uuid.uuid4())
-                timestamp = datetime.utcnow().isoformat() + "Z"
-                filename = f"{camera_id}_{event_id}.jpg"
-                filepath = os.path.join(RAM_DISK_PATH, filename)
+            for camera_id, frame, (cls_ids, scores) in zip(batch_ids[start:], chunk, boxes):
+                if not cls_ids:
+                    continue
+                if timestamp is None:
+                    timestamp = datetime.utcnow().isoformat() + "Z"
+                detected.append((camera_id, frame, cls_ids, scores))
 
-                # Save Image to RAM (Instant)
-                cv2.imwrite(filepath, frame)
-
-                # Construct Signal
-                payload = {
-                    "id": event_id,
-                    "camera": camera_id,
-                    "time": timestamp,
-                    "file": filepath, # Pointer to RAM
-                    "class": model.names[int(box.cls)],
-                    "score": float(box.conf)
-                }
-
-                # Fire Signal
-                r.publish(REDIS_CHANNEL, json.dumps(payload))
-                print(f" -> [v2-Eye] Saw {payload['class']} ({payload['score']:.2f}) -> Saved to RAM")
+            if detected:
+                try:
+                    output_q.put_nowait((timestamp, detected))
+                except queue.Full:
+                    print("[v2-Eye] Output backlog full, dropping detections")
 
         # Optional: Sleep slightly to save CPU if 30fps isn't needed
         # time.sleep(0.05)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--camid", required=True)
-    parser.add_argument("--source", required=True)
+    parser.add_argument("--camid", required=True, help="Camera id, or comma-separated list")
+    parser.add_argument("--source", required=True, help="RTSP url, or comma-separated list")
+    parser.add_argument("--hwaccel", choices=sorted(HWACCEL_MODES), default="any",
+                        help="Video decode acceleration (default: any available)")
+    parser.add_argument("--redis-socket", default=None,
+                        help="Redis UNIX socket path, e.g. /var/run/redis/redis.sock")
+    parser.add_argument("--int8", action="store_true", help="Export INT8 engine instead of FP16")
+    parser.add_argument("--calib", default=None, help="Dataset yaml with INT8 calibration frames")
+    parser.add_argument("--prune-classes", action="store_true",
+                        help="Cut the model head down to person/car before export")
+    parser.add_argument("--cuda-graph", action="store_true",
+                        help="Replay the PyTorch model as a CUDA graph (no TensorRT engine)")
+    parser.add_argument("--motion-threshold", type=float, default=0.0,
+                        help="Skip frames whose mean abs diff (0-255) from the last inferred "
+                             "frame is below this; 0 disables the gate")
     args = parser.parse_args()
 
+    camera_ids = args.camid.split(",")
+    rtsp_urls = args.source.split(",")
+    if len(camera_ids) != len(rtsp_urls):
+        parser.error("--camid and --source must list the same number of cameras")
+
     # Ensure RAM disk exists
     os.makedirs(RAM_DISK_PATH, exist_ok=True)
 
-    run_worker(args.camid, args.source)
+    if args.int8 and not args.calib:
+        parser.error("--int8 needs --calib")
+
+    run_worker(camera_ids, rtsp_urls, hwaccel=args.hwaccel,
+               motion_threshold=args.motion_threshold, int8=args.int8, calib_data=args.calib,
+               redis_socket=args.redis_socket, prune=args.prune_classes,
+               cuda_graph=args.cuda_graph)